@@ -0,0 +1,70 @@
+"""
+Shared Playwright browser that is launched once and hands out fresh contexts.
+Avoids paying Chromium startup on every discovery/test run in the same process.
+"""
+
+import asyncio
+from typing import Dict
+from playwright.async_api import async_playwright, BrowserContext
+
+DEFAULT_VIEWPORT = {"width": 1280, "height": 800}
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+DEFAULT_ARGS = ['--disable-blink-features=AutomationControlled']
+# Extra flags for headless runs in containers/CI (no sandbox, /dev/shm or GPU available)
+HEADLESS_ARGS = DEFAULT_ARGS + ['--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu']
+
+
+class BrowserPool:
+    """Keeps one Chromium process alive and vends isolated contexts from it."""
+
+    def __init__(self, headless: bool = False, args: list = None):
+        """Configure the browser launch; nothing is started until the first get()."""
+        self.headless = headless
+        self.args = args if args is not None else DEFAULT_ARGS
+        self._playwright = None
+        self._browser = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, **context_options) -> BrowserContext:
+        """
+        Get a new browser context, launching the browser on first use.
+
+        Args:
+            **context_options: Overrides for browser.new_context (viewport, user_agent, ...)
+
+        Returns:
+            A fresh BrowserContext; the caller closes it when done
+        """
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=self.headless,
+                    args=self.args
+                )
+
+        options = {"viewport": DEFAULT_VIEWPORT, "user_agent": DEFAULT_USER_AGENT, **context_options}
+        return await self._browser.new_context(**options)
+
+    async def close(self):
+        """Close the browser and stop Playwright."""
+        async with self._lock:
+            if self._browser:
+                await self._browser.close()
+                self._browser = None
+            if self._playwright:
+                await self._playwright.stop()
+                self._playwright = None
+
+
+# One pool per launch configuration (headless, args)
+_pools: Dict[tuple, BrowserPool] = {}
+
+
+def get_browser_pool(headless: bool = False, args: list = None) -> BrowserPool:
+    """Get the process-wide browser pool for this launch configuration, creating it on first call."""
+    key = (headless, tuple(args if args is not None else DEFAULT_ARGS))
+    if key not in _pools:
+        _pools[key] = BrowserPool(headless=headless, args=args)
+    return _pools[key]
@@ -8,21 +8,38 @@ Claude makes its own decisions about workflow and tool usage.
 """
 
 import asyncio
+import functools
+import io
 import json
 import os
+import sys
+import time
+from collections import defaultdict
 from datetime import datetime
+from urllib.parse import urlparse
 from playwright.async_api import async_playwright
+from browser_pool import get_browser_pool, DEFAULT_ARGS, HEADLESS_ARGS
 from sonnet_tools_interface import get_tools_for_sonnet, create_tool_handler
+from script_utils import dump_json, run_async
+
+# Tool definitions are static; fetch them once for every task
+_TOOLS = get_tools_for_sonnet()
+
+# Headless by default; set SONNET_HEADLESS=0 to watch the browser
+HEADLESS = os.environ.get("SONNET_HEADLESS", "1") == "1"
+BROWSER_ARGS = HEADLESS_ARGS if HEADLESS else DEFAULT_ARGS
+
+# Number of tasks run at the same time, each on its own page
+MAX_CONCURRENT_TASKS = 2
+
+# Wall-clock budget for the whole run; unfinished tasks are cancelled and recorded as timed out
+GLOBAL_BUDGET_S = 600
 
 # Test tasks for Claude to complete autonomously
 TEST_TASKS = [
     {
         "task_id": "job_search_seattle",
-<<<<<<< HEAD
         "description": "Find product manager jobs in Seattle. Navigate to aijobs.ai and use the available tools to search for and gather information about product manager positions in Seattle.",
-=======
-        "description": "Find product manager jobs in Seattle.",
->>>>>>> aad1e90c59ffe40c61d68f7bc6283b67a8f75fff
         "starting_url": "https://aijobs.ai",
         "success_criteria": [
             "Successfully navigate to the website",
@@ -45,26 +62,60 @@ TEST_TASKS = [
     }
 ]
 
+# Element types each task actually looks at in its analysis; others ask for everything
+TASK_ELEMENT_TYPES = {
+    "job_search_seattle": ["input", "button", "link"],
+    "form_interaction": ["input", "button"]
+}
+
+# Wall-clock/monotonic pair used to turn monotonic log stamps into dates at summary time
+_WALL_ANCHOR = time.time()
+_MONO_ANCHOR_NS = time.monotonic_ns()
+
+
+def _format_monotonic(t_ns: int) -> str:
+    """ISO timestamp for a time.monotonic_ns() reading taken in this process."""
+    return datetime.fromtimestamp(_WALL_ANCHOR + (t_ns - _MONO_ANCHOR_NS) / 1e9).isoformat()
+
+
+def _bucketize(elements: list):
+    """
+    Group analyzed elements in one pass.
+    
+    Returns (elements by type, search-like elements).
+    """
+    by_type = defaultdict(list)
+    search_like = []
+    for element in elements:
+        by_type[element.get("type")].append(element)
+        if "search" in element.get("label", "").lower():
+            search_like.append(element)
+    return by_type, search_like
+
+
 class ClaudeToolExecutor:
     """Handles tool execution for Claude's autonomous decisions."""
     
-    def __init__(self):
+    def __init__(self, page=None):
+        """Drive the given (pooled) page, or launch a private browser in setup_browser()."""
         self.tool_handler = None
+        self.page = page
         self.browser = None
         self.execution_log = []
         
     async def setup_browser(self):
         """Set up browser for tool execution."""
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(
-            headless=False,
-            args=['--disable-blink-features=AutomationControlled']
-        )
-        
-        page = await self.browser.new_page(
-            viewport={"width": 1280, "height": 800},
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-        )
+        page = self.page
+        if page is None:
+            playwright = await async_playwright().start()
+            self.browser = await playwright.chromium.launch(
+                headless=HEADLESS,
+                args=BROWSER_ARGS
+            )
+            page = await self.browser.new_page(
+                viewport={"width": 1280, "height": 800},
+                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+            )
         
         self.tool_handler = create_tool_handler(page)
         return page
@@ -82,7 +133,7 @@ class ClaudeToolExecutor:
             
             # Log the execution
             log_entry = {
-                "timestamp": datetime.now().isoformat(),
+                "t_ns": time.monotonic_ns(),
                 "tool_name": tool_name,
                 "parameters": parameters,
                 "result": result,
@@ -97,14 +148,15 @@ class ClaudeToolExecutor:
             return result
             
         except Exception as e:
+            t_ns = time.monotonic_ns()
             error_result = {
                 "success": False,
                 "error": str(e),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": _format_monotonic(t_ns)
             }
             
             log_entry = {
-                "timestamp": datetime.now().isoformat(),
+                "t_ns": t_ns,
                 "tool_name": tool_name,
                 "parameters": parameters,
                 "result": error_result,
@@ -117,6 +169,7 @@ class ClaudeToolExecutor:
     
     async def cleanup(self):
         """Clean up browser resources."""
+        # Pages passed in are closed by the caller; only a private browser is closed here
         if self.browser:
             await self.browser.close()
     
@@ -131,7 +184,10 @@ class ClaudeToolExecutor:
             "failed_calls": total_calls - successful_calls,
             "success_rate": (successful_calls / total_calls * 100) if total_calls > 0 else 0,
             "tools_used": list(set(log["tool_name"] for log in self.execution_log)),
-            "execution_log": self.execution_log
+            "execution_log": [
+                {"timestamp": _format_monotonic(log["t_ns"]), **{k: v for k, v in log.items() if k != "t_ns"}}
+                for log in self.execution_log
+            ]
         }
 
 def create_claude_prompt(task: dict, available_tools: list) -> str:
@@ -158,34 +214,30 @@ def create_claude_prompt(task: dict, available_tools: list) -> str:
 1. Use the available tools to complete the task
 2. Make autonomous decisions about which tools to call and when
 3. Start by navigating to the starting URL
-<<<<<<< HEAD
 4. Analyze the page to understand its structure
 5. Take appropriate actions based on what you find
 6. Be methodical and explain your reasoning for each tool call
-=======
-4. Break the task into subtasks and use the tools to complete the task.
-5. Take appropriate actions based on what you find
-6. Be methodical and explain your reasoning for each tool call
-7. Wait for tool calls to complete before making the next tool call.
->>>>>>> aad1e90c59ffe40c61d68f7bc6283b67a8f75fff
 
 Begin by calling the appropriate tools to complete this task. You should start with navigating to the URL and then analyzing the page structure."""
 
     return prompt
 
-async def run_autonomous_test(task: dict):
-    """Run a single autonomous test with Claude."""
-    print(f"\n{'='*60}")
-    print(f"🎯 AUTONOMOUS TEST: {task['task_id']}")
-    print(f"📋 Task: {task['description']}")
-    print(f"🌐 Starting URL: {task['starting_url']}")
-    print(f"{'='*60}")
+async def run_autonomous_test(task: dict, page=None):
+    """Run a single autonomous test with Claude, on `page` if given."""
+    # Sections are written in one go so concurrent tasks don't interleave lines
+    buf = io.StringIO()
+    print(f"\n{'='*60}", file=buf)
+    print(f"🎯 AUTONOMOUS TEST: {task['task_id']}", file=buf)
+    print(f"📋 Task: {task['description']}", file=buf)
+    print(f"🌐 Starting URL: {task['starting_url']}", file=buf)
+    print(f"{'='*60}", file=buf)
     
-    # Get available tools
-    available_tools = get_tools_for_sonnet()
+    available_tools = _TOOLS
     
-    # Create tool executor
-    executor = ClaudeToolExecutor()
+    # Create tool executor, with one bound caller per tool used below
+    executor = ClaudeToolExecutor(page)
+    navigate = functools.partial(executor.execute_tool_call, "navigate_to_url")
+    analyze = functools.partial(executor.execute_tool_call, "analyze_viewport_screenshot")
     
     try:
         # Set up browser
@@ -193,69 +245,72 @@ async def run_autonomous_test(task: dict):
         
         # Create prompt for Claude
         prompt = create_claude_prompt(task, available_tools)
-        print(f"\n📝 CLAUDE PROMPT:")
-        print("-" * 40)
-        print(prompt)
-        print("-" * 40)
+        print(f"\n📝 CLAUDE PROMPT:", file=buf)
+        print("-" * 40, file=buf)
+        print(prompt, file=buf)
+        print("-" * 40, file=buf)
         
         # In a real implementation, you would send this prompt to Claude API
         # along with the tool definitions and let Claude make autonomous decisions
         
-        print(f"\n🤖 CLAUDE WOULD NOW:")
-        print("1. Receive this prompt and the tool definitions")
-        print("2. Autonomously decide which tools to call")
-        print("3. Make tool calls based on its reasoning")
-        print("4. Complete the task using its own workflow")
+        print(f"\n🤖 CLAUDE WOULD NOW:", file=buf)
+        print("1. Receive this prompt and the tool definitions", file=buf)
+        print("2. Autonomously decide which tools to call", file=buf)
+        print("3. Make tool calls based on its reasoning", file=buf)
+        print("4. Complete the task using its own workflow", file=buf)
         
-        print(f"\n🔧 AVAILABLE TOOLS FOR CLAUDE:")
+        print(f"\n🔧 AVAILABLE TOOLS FOR CLAUDE:", file=buf)
         for tool in available_tools:
-            print(f"   • {tool['name']}")
+            print(f"   • {tool['name']}", file=buf)
         
         # Simulate what Claude might do (for demonstration)
-        print(f"\n🎭 DEMONSTRATION - Simulating Claude's autonomous decisions:")
+        print(f"\n🎭 DEMONSTRATION - Simulating Claude's autonomous decisions:", file=buf)
+        sys.stdout.write(buf.getvalue())
         
         # Claude would autonomously decide to start with navigation
         print(f"\n🤖 Claude decides: 'I should start by navigating to {task['starting_url']}'")
-        nav_result = await executor.execute_tool_call("navigate_to_url", {
+        nav_result = await navigate({
             "url": task["starting_url"]
         })
         
         if nav_result.get("success"):
             # Claude would then decide to analyze the page
             print(f"\n🤖 Claude decides: 'Now I should analyze the page to understand its structure'")
-            analysis_result = await executor.execute_tool_call("analyze_viewport_screenshot", {
+            analysis_result = await analyze({
                 "include_description": True,
-                "element_types": ["all"]
+                "element_types": TASK_ELEMENT_TYPES.get(task["task_id"], ["all"])
             })
             
             if analysis_result.get("success"):
                 elements = analysis_result.get("elements", [])
                 print(f"\n📊 Claude found {len(elements)} interactive elements")
+                by_type, search_elements = _bucketize(elements)
                 
                 # Claude would analyze the elements and decide next steps
                 print(f"\n🤖 Claude analyzes the elements and decides on next actions based on the task...")
                 
                 # For job search task, Claude might look for search functionality
                 if task["task_id"] == "job_search_seattle":
-                    search_elements = [e for e in elements if "search" in e.get("label", "").lower()]
                     if search_elements:
                         print(f"🤖 Claude decides: 'I found search elements, I'll use them to search for jobs'")
                         # Claude would continue with its autonomous workflow...
                 
                 # For form task, Claude might look for form fields
                 elif task["task_id"] == "form_interaction":
-                    form_elements = [e for e in elements if e["type"] == "input"]
+                    form_elements = by_type["input"]
                     if form_elements:
                         print(f"🤖 Claude decides: 'I found {len(form_elements)} form fields, I'll fill them out'")
                         # Claude would continue with its autonomous workflow...
         
         # Get execution summary
         summary = executor.get_execution_summary()
-        print(f"\n📊 EXECUTION SUMMARY:")
-        print(f"   • Total tool calls: {summary['total_tool_calls']}")
-        print(f"   • Successful calls: {summary['successful_calls']}")
-        print(f"   • Success rate: {summary['success_rate']:.1f}%")
-        print(f"   • Tools used: {', '.join(summary['tools_used'])}")
+        buf = io.StringIO()
+        print(f"\n📊 EXECUTION SUMMARY:", file=buf)
+        print(f"   • Total tool calls: {summary['total_tool_calls']}", file=buf)
+        print(f"   • Successful calls: {summary['successful_calls']}", file=buf)
+        print(f"   • Success rate: {summary['success_rate']:.1f}%", file=buf)
+        print(f"   • Tools used: {', '.join(summary['tools_used'])}", file=buf)
+        sys.stdout.write(buf.getvalue())
         
         return summary
         
@@ -270,41 +325,80 @@ async def main():
     print("and make completely autonomous decisions about which tools to call and when.")
     
     all_results = []
+    run_ts = datetime.now()
+    
+    # Browser launched once per process. Tasks on the same site share one context
+    # (and so its HTTP cache and TLS sessions), each on a fresh page
+    browser_pool = get_browser_pool(headless=HEADLESS, args=BROWSER_ARGS)
+    contexts = {}
+    contexts_lock = asyncio.Lock()
+    sem = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
     
-    for task in TEST_TASKS:
+    async def run_in_site_context(task):
+        origin = urlparse(task["starting_url"]).netloc
+        async with sem:
+            async with contexts_lock:
+                if origin not in contexts:
+                    contexts[origin] = await browser_pool.get()
+            page = await contexts[origin].new_page()
+            try:
+                return await run_autonomous_test(task, page)
+            finally:
+                await page.close()
+    
+    outcomes = [None] * len(TEST_TASKS)
+    
+    async def run_guarded(index, task):
         try:
-            result = await run_autonomous_test(task)
+            outcomes[index] = await run_in_site_context(task)
+        except asyncio.CancelledError:
+            outcomes[index] = TimeoutError(f"Exceeded the {GLOBAL_BUDGET_S}s run budget")
+            raise
+        except Exception as e:
+            outcomes[index] = e
+    
+    try:
+        async with asyncio.timeout(GLOBAL_BUDGET_S):
+            async with asyncio.TaskGroup() as tg:
+                for index, task in enumerate(TEST_TASKS):
+                    tg.create_task(run_guarded(index, task))
+    except TimeoutError:
+        print(f"\n⏰ Run budget of {GLOBAL_BUDGET_S}s used up; unfinished tasks were cancelled")
+    finally:
+        for ctx in contexts.values():
+            await ctx.close()
+        await browser_pool.close()
+    
+    for task, outcome in zip(TEST_TASKS, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"❌ Test failed: {str(outcome)}")
             all_results.append({
                 "task_id": task["task_id"],
-                "result": result
+                "error": str(outcome)
             })
-        except Exception as e:
-            print(f"❌ Test failed: {str(e)}")
+        else:
             all_results.append({
                 "task_id": task["task_id"],
-                "error": str(e)
+                "result": outcome
             })
-        
-        # Wait between tests
-        print("\n⏳ Waiting before next test...")
-        await asyncio.sleep(3)
     
     # Save results
-    results_file = f"claude_autonomous_test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(results_file, 'w') as f:
-        json.dump({
-            "test_type": "claude_autonomous",
-            "timestamp": datetime.now().isoformat(),
-            "tasks": TEST_TASKS,
-            "results": all_results
-        }, f, indent=2)
+    results_file = f"claude_autonomous_test_results_{run_ts.strftime('%Y%m%d_%H%M%S')}.json"
+    dump_json({
+        "test_type": "claude_autonomous",
+        "timestamp": run_ts.isoformat(),
+        "tasks": TEST_TASKS,
+        "results": all_results
+    }, results_file)
     
-    print(f"\n💾 Results saved to: {results_file}")
-    print("\n🎯 NEXT STEPS:")
-    print("1. Integrate this with actual Claude API")
-    print("2. Send the prompts and tool definitions to Claude")
-    print("3. Let Claude make real autonomous tool decisions")
-    print("4. Observe Claude's actual reasoning and workflow")
+    buf = io.StringIO()
+    print(f"\n💾 Results saved to: {results_file}", file=buf)
+    print("\n🎯 NEXT STEPS:", file=buf)
+    print("1. Integrate this with actual Claude API", file=buf)
+    print("2. Send the prompts and tool definitions to Claude", file=buf)
+    print("3. Let Claude make real autonomous tool decisions", file=buf)
+    print("4. Observe Claude's actual reasoning and workflow", file=buf)
+    sys.stdout.write(buf.getvalue())
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run_async(main())
\ No newline at end of file
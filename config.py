@@ -3,24 +3,71 @@ Configuration for vision-based web scraping with Qwen2.5-VL-72B
 """
 
 import os
+import httpx
 from openai import OpenAI
 
+try:
+    import h2  # noqa: F401  (lets httpx speak HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 # Vision model configuration
 VISION_MODEL = "Qwen/Qwen2.5-VL-72B-Instruct"
 
+# Shared system prompt for screenshot analysis. Keeping it byte-identical across
+# calls lets the inference server reuse its prefix KV cache; task-specific
+# instructions go in the user message after it.
+VISION_SYSTEM_PROMPT = (
+    "You analyze UI screenshots and return strict JSON. No prose. No code fences.\n"
+    "Coordinates are pixels within the screenshot.\n"
+    "If a list is requested and nothing matches, return []."
+)
+
 # API configuration
 NEBIUS_API_KEY = os.getenv("NEBIUS_API_KEY")
 API_BASE_URL = os.getenv("API_BASE_URL", "https://api.studio.nebius.ai/v1")
 
+# Public URL under which the screenshots/ directory is served. When set, the
+# viewport analyzer sends the model a link to the saved file instead of base64.
+SCREENSHOT_BASE_URL = os.getenv("SCREENSHOT_BASE_URL")
+
 # Check if API is available
 LLM_API_AVAILABLE = bool(NEBIUS_API_KEY)
 
+# Connection pool shared by every vision call in the process
+HTTP_MAX_CONNECTIONS = 64
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 32
+# Idle connections outlive the gaps between calls (httpx drops them after 5s by default)
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 60.0
+HTTP_TIMEOUT_SECONDS = 120.0
+
+_client = None
+
+
 def get_openai_client():
-    """Get configured OpenAI client for Nebius/Qwen."""
+    """
+    Get configured OpenAI client for Nebius/Qwen.
+    
+    One client is shared per process so calls reuse pooled keep-alive
+    connections (HTTP/2 when h2 is installed) instead of new TLS handshakes.
+    """
+    global _client
     if not NEBIUS_API_KEY:
         return None
     
-    return OpenAI(
-        api_key=NEBIUS_API_KEY,
-        base_url=API_BASE_URL
-    )
\ No newline at end of file
+    if _client is None:
+        _client = OpenAI(
+            api_key=NEBIUS_API_KEY,
+            base_url=API_BASE_URL,
+            http_client=httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS
+                ),
+                timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS)
+            )
+        )
+    return _client
\ No newline at end of file
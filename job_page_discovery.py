@@ -6,17 +6,92 @@ Finds all job listing pages on a website by visual analysis.
 import base64
 import json
 import os
+import re
 from datetime import datetime
 from typing import List, Dict, Optional, Set
 from urllib.parse import urlparse, urljoin
 from playwright.async_api import Page
 import asyncio
 
+from config import VISION_SYSTEM_PROMPT
+
 # Configuration
 VISION_MODEL = "Qwen/Qwen2.5-VL-72B-Instruct"
 MAX_PAGES_TO_EXPLORE = 50
 MAX_DEPTH = 3
 
+# Accessible names that suggest a link/button leads towards job listings
+JOB_LINK_PATTERN = re.compile(
+    r"career|jobs?\b|join us|work with us|open(ing|ings)\b|open positions|vacanc|hiring|opportunit|internship",
+    re.IGNORECASE
+)
+
+
+async def ax_find_job_links(page: Page, limit: int = 10, scroll_into_view: bool = False) -> List[Dict]:
+    """
+    Find job-related links and buttons from the accessibility tree, without a screenshot.
+    
+    Args:
+        page: Playwright page object
+        limit: Maximum number of elements to return
+        scroll_into_view: Scroll each element into view before reading its bbox
+        
+    Returns:
+        List of dicts with label, role, href (absolute, or None for buttons) and
+        bbox [x, y, width, height] in viewport pixels. Empty if nothing matched.
+    """
+    # Playwright no longer exposes page.accessibility; read Chromium's AX tree over CDP
+    cdp = await page.context.new_cdp_session(page)
+    try:
+        nodes = (await cdp.send("Accessibility.getFullAXTree"))["nodes"]
+    finally:
+        await cdp.detach()
+    if not nodes:
+        return []
+    
+    # Depth-first walk in document order, collecting unique (role, name) matches
+    by_id = {node["nodeId"]: node for node in nodes}
+    candidates = []
+    seen = set()
+    stack = [nodes[0]]
+    while stack:
+        node = stack.pop()
+        if not node.get("ignored"):
+            role = node.get("role", {}).get("value")
+            name = str(node.get("name", {}).get("value") or "").strip()
+            if role in ("link", "button") and name and (role, name) not in seen and JOB_LINK_PATTERN.search(name):
+                seen.add((role, name))
+                candidates.append((role, name))
+        stack.extend(by_id[child] for child in reversed(node.get("childIds", [])) if child in by_id)
+    
+    elements = []
+    for role, name in candidates:
+        if len(elements) >= limit:
+            break
+        
+        locator = page.get_by_role(role, name=name, exact=True).first
+        try:
+            if scroll_into_view:
+                await locator.scroll_into_view_if_needed(timeout=1000)
+            box = await locator.bounding_box(timeout=1000)
+            href = await locator.get_attribute("href", timeout=1000) if role == "link" else None
+        except Exception:
+            continue
+        
+        if not box:
+            continue  # Not rendered (e.g. inside a collapsed menu)
+        
+        elements.append({
+            "label": name,
+            "role": role,
+            "href": urljoin(page.url, href) if href else None,
+            "bbox": [int(box["x"]), int(box["y"]), int(box["width"]), int(box["height"])],
+            "source": "accessibility"
+        })
+    
+    return elements
+
+
 class JobPageDiscovery:
     def __init__(self, client, verbose=False):
         """Initialize job page discovery with vision model client."""
@@ -156,36 +231,15 @@ class JobPageDiscovery:
                     print(f"[JobDiscovery] Analyzing viewport {viewport_count} (position: {scroll_position}px)")
                 
                 # Ask vision model to find ALL clickable elements with exact bboxes
-                prompt = """Identify ALL clickable elements related to jobs/careers in this screenshot.
-
-Look for:
-- "Careers", "Jobs", "Work with Us", "Join Us", "Opportunities"
-- "Open Positions", "Vacancies", "Employment", "Hiring"
-- "Early Careers", "Students", "Graduates", "Internships"
-- Any clickable text/button suggesting jobs or careers
-
-IMPORTANT: Provide exact bounding box coordinates for EACH clickable element.
-
-Return ONLY a JSON array with exact coordinates:
-[{"label": "text on element", "bbox": [x1, y1, x2, y2], "clickable": true}]
+                prompt = """TASK: find_job_navigation
+Find ALL clickable elements related to jobs/careers: "Careers", "Jobs", "Work with Us", "Join Us",
+"Opportunities", "Open Positions", "Vacancies", "Employment", "Hiring", "Early Careers", "Students",
+"Graduates", "Internships", or any other text/button suggesting jobs or careers.
 
-bbox format: [left, top, right, bottom] in pixels
-If none found, return: []"""
+Output: [{"label": "text on element", "bbox": [x1, y1, x2, y2], "clickable": true}]
+bbox format: [left, top, right, bottom]"""
 
-                response = self.client.chat.completions.create(
-                    model=VISION_MODEL,
-                    temperature=0.1,
-                    max_tokens=300,
-                    messages=[{
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"}}
-                        ]
-                    }]
-                )
-                
-                result = response.choices[0].message.content.strip()
+                result = self._ask_vision(prompt, screenshot_base64)
                 
                 # Extract JSON
                 if '```json' in result:
@@ -328,33 +382,13 @@ If none found, return: []"""
                 self._save_debug_screenshot(page.url, screenshot_bytes, "check_menus")
             
             # Ask vision model to find expandable menus
-            prompt = """Identify ALL expandable navigation elements in this screenshot:
-
-Look for:
-- Hamburger menus (☰ three lines icon)
-- Dropdown arrows (▼ or similar)
-- "More" or "Menu" buttons
-- Any clickable element that might expand to show more options
-
-Return ONLY a JSON array:
-[{"label": "description", "bbox": [x1, y1, x2, y2], "type": "hamburger|dropdown|more"}]
+            prompt = """TASK: find_expandable_menus
+Find ALL expandable navigation elements: hamburger menus (☰), dropdown arrows (▼ or similar),
+"More" or "Menu" buttons, or anything that might expand to show more options.
 
-If none found, return: []"""
+Output: [{"label": "description", "bbox": [x1, y1, x2, y2], "type": "hamburger|dropdown|more"}]"""
 
-            response = self.client.chat.completions.create(
-                model=VISION_MODEL,
-                temperature=0.1,
-                max_tokens=300,
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"}}
-                    ]
-                }]
-            )
-            
-            result = response.choices[0].message.content.strip()
+            result = self._ask_vision(prompt, screenshot_base64)
             
             # Extract JSON
             if '```json' in result:
@@ -401,29 +435,12 @@ If none found, return: []"""
                             self._save_debug_screenshot(page.url, expanded_screenshot, f"expanded_{menu.get('type', 'menu')}")
                         
                         # Look for job links in expanded menu
-                        find_prompt = """Find career/job related links in this expanded menu:
+                        find_prompt = """TASK: find_job_links_in_menu
+Find career/job related links in this expanded menu: Careers, Jobs, Work with Us, Opportunities, etc.
 
-Look for: Careers, Jobs, Work with Us, Opportunities, etc.
+Output: [{"label": "text", "bbox": [x1, y1, x2, y2]}]"""
 
-Return ONLY a JSON array:
-[{"label": "text", "bbox": [x1, y1, x2, y2]}]
-
-If none found, return: []"""
-
-                        find_response = self.client.chat.completions.create(
-                            model=VISION_MODEL,
-                            temperature=0.1,
-                            max_tokens=300,
-                            messages=[{
-                                "role": "user",
-                                "content": [
-                                    {"type": "text", "text": find_prompt},
-                                    {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{expanded_base64}"}}
-                                ]
-                            }]
-                        )
-                        
-                        find_result = find_response.choices[0].message.content.strip()
+                        find_result = self._ask_vision(find_prompt, expanded_base64)
                         
                         # Extract JSON
                         if '```json' in find_result:
@@ -509,15 +526,11 @@ If none found, return: []"""
                 self._save_debug_screenshot(page.url, screenshot_bytes, "verification")
             
             # Ask vision model to analyze if this is a job listing page
-            prompt = """Analyze this webpage and determine if it's a job listing page.
-
-Look for these patterns:
-1. Multiple job cards/listings in a grid or list layout
-2. Job titles (e.g., "Software Engineer", "Product Manager")
-3. Location infor
+            prompt = """TASK: classify_job_page
+Determine if this webpage is a job listing page. Look for multiple job cards/listings in a grid or
+list layout, job titles (e.g., "Software Engineer", "Product Manager") and location information.
 
-
-Return a JSON response:
+Output:
 {
   "is_job_page": true/false,
   "confidence": 0.0-1.0,
@@ -526,25 +539,7 @@ Return a JSON response:
   "indicators": ["multiple apply buttons", "job titles visible", etc]
 }"""
 
-            response = self.client.chat.completions.create(
-                model=VISION_MODEL,
-                temperature=0.1,
-                max_tokens=300,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"}
-                            }
-                        ]
-                    }
-                ]
-            )
-            
-            result = response.choices[0].message.content.strip()
+            result = self._ask_vision(prompt, screenshot_base64)
             
             try:
                 analysis = json.loads(result)
@@ -564,46 +559,33 @@ Return a JSON response:
             return {"is_job_page": False, "confidence": 0.0}
     
     async def _find_job_links_on_page(self, page: Page) -> List[str]:
-        """Find any job-related links on the current page using vision model."""
+        """Find any job-related links on the current page, falling back to the vision model."""
+        # Cheap path: read link names from the accessibility tree; vision is the fallback
+        try:
+            ax_links = [link['href'] for link in await ax_find_job_links(page) if link['href']]
+        except Exception as e:
+            if self.verbose:
+                print(f"[JobDiscovery] Accessibility lookup failed: {e}")
+            ax_links = []
+        if ax_links:
+            if self.verbose:
+                print(f"[JobDiscovery] Found {len(ax_links)} job links via accessibility tree")
+            return ax_links
+        
         try:
             screenshot_bytes = await page.screenshot(full_page=False)
             screenshot_base64 = base64.b64encode(screenshot_bytes).decode('utf-8')
             
             # Look for any job-related links
-            prompt = """Analyze this page and find ALL links that might lead to job listings or job-related pages.
-
-Look for links containing:
-- "View Jobs", "See Openings", "Browse Positions"
-- "Apply Now", "Join Team", "Current Openings"
-- Department/team names with job indicators
-- Location-based job links
-- "Search Jobs", "Find Jobs", "Explore Opportunities"
-- Any text suggesting job listings or application processes
-
-Return JSON array of clickable elements:
-[{"label": "text of link", "bbox": [x1, y1, x2, y2]}]
+            prompt = """TASK: find_job_links
+Find ALL links that might lead to job listings or job-related pages: "View Jobs", "See Openings",
+"Browse Positions", "Apply Now", "Join Team", "Current Openings", "Search Jobs", "Find Jobs",
+"Explore Opportunities", department/team or location-based job links, or any text suggesting
+job listings or application processes.
 
-Return [] if no job-related links found."""
+Output: [{"label": "text of link", "bbox": [x1, y1, x2, y2]}]"""
 
-            response = self.client.chat.completions.create(
-                model=VISION_MODEL,
-                temperature=0.1,
-                max_tokens=500,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"}
-                            }
-                        ]
-                    }
-                ]
-            )
-            
-            result = response.choices[0].message.content.strip()
+            result = self._ask_vision(prompt, screenshot_base64, max_tokens=500)
             
             # Extract JSON from markdown code blocks if present
             if result.startswith('```json'):
@@ -668,39 +650,14 @@ Return [] if no job-related links found."""
             screenshot_base64 = base64.b64encode(screenshot_bytes).decode('utf-8')
             
             # Look for pagination and category links
-            prompt = """Find pagination and job category navigation on this job listing page.
-
-Look for:
-- Page numbers (2, 3, 4, etc.)
-- "Next", "Load More", "Show More" buttons
-- Department/category filters (Engineering, Sales, Marketing)
-- Location filters
-- Job type filters (Full-time, Remote, etc.)
-
-Return JSON array of clickable elements that lead to more job listings:
-[{"label": "Page 2", "bbox": [x, y, width, height]}]
+            prompt = """TASK: find_pagination
+Find clickable elements on this job listing page that lead to more job listings: page numbers
+(2, 3, 4, etc.), "Next", "Load More", "Show More" buttons, department/category filters
+(Engineering, Sales, Marketing), location filters, job type filters (Full-time, Remote, etc.).
 
-Return [] if none found."""
+Output: [{"label": "Page 2", "bbox": [x, y, width, height]}]"""
 
-            response = self.client.chat.completions.create(
-                model=VISION_MODEL,
-                temperature=0.1,
-                max_tokens=300,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"}
-                            }
-                        ]
-                    }
-                ]
-            )
-            
-            result = response.choices[0].message.content.strip()
+            result = self._ask_vision(prompt, screenshot_base64)
             
             # Extract JSON from markdown code blocks if present
             if '```json' in result:
@@ -755,6 +712,26 @@ Return [] if none found."""
                 print(f"[JobDiscovery] Error finding related pages: {e}")
             return []
     
+    def _ask_vision(self, prompt: str, screenshot_base64: str, max_tokens: int = 300) -> str:
+        """Send a task prompt and screenshot to the vision model behind the shared system prompt."""
+        response = self.client.chat.completions.create(
+            model=VISION_MODEL,
+            temperature=0.1,
+            max_tokens=max_tokens,
+            messages=[
+                {"role": "system", "content": VISION_SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"}}
+                    ]
+                }
+            ]
+        )
+        
+        return response.choices[0].message.content.strip()
+    
     def _save_debug_screenshot(self, url: str, screenshot_bytes: bytes, stage: str):
         """Save debug screenshot."""
         try:
@@ -0,0 +1,35 @@
+"""
+Small helpers shared by the test and discovery scripts.
+"""
+
+import asyncio
+import json
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import uvloop  # Faster event loop for the Playwright round-trips, when installed
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+
+def dump_json(obj, path: str):
+    """Write obj to path as compact JSON (orjson when installed)."""
+    if ORJSON_AVAILABLE:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, separators=(",", ":"), ensure_ascii=False)
+
+
+def run_async(main):
+    """asyncio.run(main), on uvloop when it is installed."""
+    if UVLOOP_AVAILABLE:
+        return uvloop.run(main)
+    return asyncio.run(main)
@@ -15,24 +15,34 @@ load_dotenv(dotenv_path='.envfile')
 
 from playwright.async_api import async_playwright, Page
 from config import get_openai_client, LLM_API_AVAILABLE
+from job_page_discovery import ax_find_job_links
+from vision_batcher import get_vision_batcher
+
+# Sibling job links followed in parallel tabs when a page offers several
+MAX_PARALLEL_CANDIDATES = 5
 
-VISION_MODEL = "Qwen/Qwen2.5-VL-72B-Instruct"
 
 class SimpleJobDiscovery:
     def __init__(self, client, verbose=True):
         self.client = client
+        self.batcher = get_vision_batcher(client)
         self.verbose = verbose
         self.visited_urls = set()
         self.job_pages = []
         self.discovered_elements = []
         
-    async def discover(self, page: Page, start_url: str, max_depth=3) -> Dict:
-        """Discover job pages by following navigation."""
+    async def discover(self, page: Page, start_url: str, max_depth=3, navigate=True) -> Dict:
+        """
+        Discover job pages by following navigation.
+        
+        Pass navigate=False when the caller has already loaded start_url in page.
+        """
         
         print(f"\n🔍 Starting discovery from: {start_url}")
         
         # Navigate to start page
-        await page.goto(start_url, wait_until="domcontentloaded", timeout=60000)
+        if navigate:
+            await page.goto(start_url, wait_until="domcontentloaded", timeout=60000)
         await page.wait_for_timeout(3000)
         
         # Find and click job navigation
@@ -45,13 +55,15 @@ class SimpleJobDiscovery:
             'total_elements': len(self.discovered_elements)
         }
     
-    async def _explore_page(self, page: Page, depth: int, max_depth: int):
+    async def _explore_page(self, page: Page, depth: int, max_depth: int, stop: asyncio.Event = None):
         """Explore current page and follow job-related links."""
         
         current_url = page.url
         
         if current_url in self.visited_urls or depth > max_depth:
             return
+        if stop is not None and stop.is_set():
+            return  # A sibling branch already found a job page
             
         self.visited_urls.add(current_url)
         
@@ -66,8 +78,14 @@ class SimpleJobDiscovery:
                 'timestamp': datetime.now().isoformat()
             })
             print(f"✅ Found job listing page!")
+            if stop is not None:
+                stop.set()
+                return
             # Continue exploring for more job pages
         
+        if depth < max_depth and await self._explore_candidates(page, depth, max_depth, stop):
+            return
+        
         # Find job-related clickable elements
         element = await self._find_next_job_element(page)
         
@@ -86,15 +104,85 @@ class SimpleJobDiscovery:
                 if new_url != current_url:
                     print(f"➡️ Navigated to: {new_url}")
                     # Continue exploring on new page
-                    await self._explore_page(page, depth + 1, max_depth)
+                    await self._explore_page(page, depth + 1, max_depth, stop)
                 else:
                     print(f"⚠️ No navigation occurred")
         else:
             print(f"❌ No more job-related elements found")
     
+    async def _explore_candidates(self, page: Page, depth: int, max_depth: int,
+                                  stop: asyncio.Event = None) -> bool:
+        """
+        Follow several job links from this page at once, each in its own tab.
+        
+        The first branch that reaches a job listing page stops its siblings, and
+        (through the shared stop event) every branch of enclosing fan-outs.
+        Returns False (nothing explored) when fewer than two new links are found,
+        leaving the single-click path to handle the page.
+        """
+        try:
+            candidates = await ax_find_job_links(page, limit=MAX_PARALLEL_CANDIDATES)
+        except Exception as e:
+            if self.verbose:
+                print(f"  Accessibility lookup failed: {e}")
+            return False
+        
+        targets = {}
+        for element in candidates:
+            href = element.get('href')
+            if href and href.startswith('http') and href not in self.visited_urls:
+                targets.setdefault(href, element)
+        if len(targets) < 2:
+            return False
+        
+        print(f"🔀 Following {len(targets)} job links in parallel")
+        if stop is None:
+            stop = asyncio.Event()
+        
+        async def explore(href):
+            if stop.is_set():
+                return
+            child = None
+            try:
+                child = await page.context.new_page()
+                await child.goto(href, wait_until="domcontentloaded", timeout=60000)
+                await child.wait_for_timeout(3000)
+                if not stop.is_set():
+                    await self._explore_page(child, depth + 1, max_depth, stop)
+            except Exception as e:
+                print(f"⚠️ Failed to explore {href}: {e}")
+            finally:
+                if child is not None:
+                    await child.close()
+        
+        async with asyncio.TaskGroup() as tg:
+            for href, element in targets.items():
+                element['page_url'] = page.url
+                element['timestamp'] = datetime.now().isoformat()
+                self.discovered_elements.append(element)
+                tg.create_task(explore(href))
+        return True
+    
     async def _find_next_job_element(self, page: Page) -> Dict:
         """Find the next job-related element to click by scrolling through page."""
         
+        # Try the accessibility tree first; only screenshot when it has nothing
+        try:
+            ax_elements = await ax_find_job_links(page, limit=1, scroll_into_view=True)
+        except Exception as e:
+            if self.verbose:
+                print(f"  Accessibility lookup failed: {e}")
+            ax_elements = []
+        
+        if ax_elements:
+            element = ax_elements[0]
+            element['page_url'] = page.url
+            element['scroll_position'] = await page.evaluate("window.pageYOffset")
+            element['timestamp'] = datetime.now().isoformat()
+            if self.verbose:
+                print(f"  Found '{element['label']}' via accessibility tree")
+            return element
+        
         viewport_height = page.viewport_size['height'] if page.viewport_size else 800
         page_height = await page.evaluate("document.body.scrollHeight")
         
@@ -114,30 +202,14 @@ class SimpleJobDiscovery:
                 print(f"  Checking viewport at position {scroll_position}px")
             
             # Ask LLM to find job-related element
-            prompt = """Find ANY clickable element related to jobs/careers in this screenshot.
-
-Look for: Careers, Jobs, Work with Us, Open Positions, Join Us, Opportunities, Apply, etc.
-
-Return the FIRST job-related element found:
-{"label": "text", "bbox": [x1, y1, x2, y2]}
+            prompt = """TASK: find_first_job_element
+Find the FIRST clickable element related to jobs/careers: Careers, Jobs, Work with Us,
+Open Positions, Join Us, Opportunities, Apply, etc.
 
-Return null if none found in this viewport."""
+Output: {"label": "text", "bbox": [x1, y1, x2, y2]}, or null if none in this viewport."""
 
             try:
-                response = self.client.chat.completions.create(
-                    model=VISION_MODEL,
-                    temperature=0.1,
-                    max_tokens=200,
-                    messages=[{
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"}}
-                        ]
-                    }]
-                )
-                
-                result = response.choices[0].message.content.strip()
+                result = await self.batcher.submit(prompt, screenshot_base64, max_tokens=200)
                 
                 # Extract JSON
                 if '```json' in result:
@@ -208,31 +280,14 @@ Return null if none found in this viewport."""
         screenshot = await page.screenshot(full_page=False)
         screenshot_base64 = base64.b64encode(screenshot).decode('utf-8')
         
-        prompt = """Is this a job listing page with actual job openings?
-
-Look for:
-- Multiple job titles with apply buttons
-- Job cards in a list/grid
-- Filters for department/location
-- "Apply" buttons
+        prompt = """TASK: is_job_listing_page
+Is this a job listing page with actual job openings? Look for multiple job titles with apply
+buttons, job cards in a list/grid, filters for department/location, "Apply" buttons.
 
-Return: true or false"""
+Output: true or false"""
 
         try:
-            response = self.client.chat.completions.create(
-                model=VISION_MODEL,
-                temperature=0.1,
-                max_tokens=50,
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"}}
-                    ]
-                }]
-            )
-            
-            result = response.choices[0].message.content.strip().lower()
+            result = (await self.batcher.submit(prompt, screenshot_base64, max_tokens=50)).lower()
             return "true" in result
             
         except:
@@ -7,8 +7,9 @@ through the viewport analyzer. It provides both the tool definitions and the exe
 """
 
 import json
+from types import MappingProxyType
 from typing import Dict, List, Any
-from playwright.async_api import Page
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 from viewport_analyzer import (
     analyze_viewport_screenshot,
     perform_click_action,
@@ -17,6 +18,18 @@ from viewport_analyzer import (
     perform_scroll_action
 )
 
+try:
+    import fastjsonschema
+    FASTJSONSCHEMA_AVAILABLE = True
+except ImportError:
+    FASTJSONSCHEMA_AVAILABLE = False
+
+# How long a "domcontentloaded_idle" navigation waits for quiet after DOMContentLoaded
+NETWORK_IDLE_GRACE_MS = 1500
+
+# Element types analyzed when a call doesn't specify any (shared, never mutated)
+_DEFAULT_ELEMENT_TYPES = ("button", "input", "link", "clickable")
+
 # Tool definitions for Claude Sonnet 3.7
 SONNET_TOOLS = [
     {
@@ -31,8 +44,8 @@ SONNET_TOOLS = [
                 },
                 "wait_for": {
                     "type": "string",
-                    "enum": ["networkidle", "domcontentloaded", "load"],
-                    "description": "What to wait for after navigation",
+                    "enum": ["networkidle", "domcontentloaded", "load", "domcontentloaded_idle"],
+                    "description": "What to wait for after navigation. domcontentloaded_idle waits for DOMContentLoaded, then at most a short grace period for network quiet (faster on pages with analytics or polling)",
                     "default": "networkidle"
                 },
                 "timeout": {
@@ -85,7 +98,7 @@ SONNET_TOOLS = [
             "properties": {
                 "bbox": {
                     "type": "array",
-                    "items": {"type": "integer"},
+                    "items": {"type": "number"},
                     "minItems": 4,
                     "maxItems": 4,
                     "description": "Bounding box coordinates [x, y, width, height] of the element to click"
@@ -107,7 +120,7 @@ SONNET_TOOLS = [
             "properties": {
                 "bbox": {
                     "type": "array",
-                    "items": {"type": "integer"},
+                    "items": {"type": "number"},
                     "minItems": 4,
                     "maxItems": 4,
                     "description": "Bounding box coordinates [x, y, width, height] of the input element"
@@ -133,7 +146,7 @@ SONNET_TOOLS = [
             "properties": {
                 "bbox": {
                     "type": "array",
-                    "items": {"type": "integer"},
+                    "items": {"type": "number"},
                     "minItems": 4,
                     "maxItems": 4,
                     "description": "Bounding box coordinates [x, y, width, height] of the dropdown element"
@@ -173,146 +186,329 @@ SONNET_TOOLS = [
             },
             "required": ["x", "y"]
         }
+    },
+    {
+        "name": "batch_analyze_and_act",
+        "description": "Analyze the current viewport and immediately click, type into, or select from the first matching element, in a single call. Use this instead of analyze_viewport_screenshot followed by a perform_* action when you already know what kind of element to act on.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "action": {
+                    "type": "string",
+                    "enum": ["click", "input", "select"],
+                    "description": "Action to perform on the matched element"
+                },
+                "element_types": {
+                    "type": "array",
+                    "items": {
+                        "type": "string",
+                        "enum": ["button", "input", "link", "clickable"]
+                    },
+                    "description": "Types of elements that may be acted on (defaults depend on the action)"
+                },
+                "label_contains": {
+                    "type": "string",
+                    "description": "Only act on an element whose label contains this text (case-insensitive)"
+                },
+                "text": {
+                    "type": "string",
+                    "description": "Text to input (required for the input action)"
+                },
+                "option_value": {
+                    "type": "string",
+                    "description": "Option to select (required for the select action)"
+                },
+                "include_elements": {
+                    "type": "boolean",
+                    "description": "Whether to also return the full list of analyzed elements",
+                    "default": False
+                },
+                "verbose": {
+                    "type": "boolean",
+                    "description": "Whether to print debug information",
+                    "default": False
+                }
+            },
+            "required": ["action"]
+        }
     }
 ]
 
+# Parameter checkers, code-generated once per tool schema. Defaults are left to
+# the dispatch table so checking never mutates the caller's parameters.
+_CHECKERS = {
+    tool["name"]: fastjsonschema.compile(tool["input_schema"], use_default=False) for tool in SONNET_TOOLS
+} if FASTJSONSCHEMA_AVAILABLE else {}
 
-class SonnetWebTools:
-    """Tool execution handler for Claude Sonnet 3.7"""
+# Serialized once; the tool catalog is static
+_SONNET_TOOLS_JSON = json.dumps(SONNET_TOOLS)
+
+
+def _freeze(obj):
+    """Recursively convert dicts to read-only mappings and lists to tuples."""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+
+# Read-only from here on, so the checkers and JSON above can never go stale
+SONNET_TOOLS = _freeze(SONNET_TOOLS)
+
+# Reusable pretty-printer for tool results (payloads are plain JSON trees, no cycles)
+_PRETTY = json.JSONEncoder(indent=2, check_circular=False, ensure_ascii=False).encode
+
+
+async def _navigate_to_url(page: Page, url: str, wait_for: str = "networkidle", timeout: int = 30000) -> Dict[str, Any]:
+    """
+    Navigate to a URL and wait for page to load.
     
-    def __init__(self, page: Page):
-        """Initialize with a Playwright page object."""
-        self.page = page
+    Args:
+        page: Playwright page object
+        url: URL to navigate to
+        wait_for: What to wait for ("networkidle", "domcontentloaded", "load",
+                  or "domcontentloaded_idle" for a bounded networkidle grace period)
+        timeout: Navigation timeout in milliseconds
+        
+    Returns:
+        Dict with navigation result
+    """
+    from datetime import datetime
     
-    async def _navigate_to_url(self, url: str, wait_for: str = "networkidle", timeout: int = 30000) -> Dict[str, Any]:
-        """
-        Navigate to a URL and wait for page to load.
+    try:
+        if wait_for == "domcontentloaded_idle":
+            # Full networkidle often overshoots on pages with analytics/polling;
+            # give dynamic content a bounded grace period instead
+            await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+            try:
+                await page.wait_for_load_state("networkidle", timeout=NETWORK_IDLE_GRACE_MS)
+            except PlaywrightTimeoutError:
+                pass
+        else:
+            await page.goto(url, wait_until=wait_for, timeout=timeout)
         
-        Args:
-            url: URL to navigate to
-            wait_for: What to wait for ("networkidle", "domcontentloaded", "load")
-            timeout: Navigation timeout in milliseconds
-            
-        Returns:
-            Dict with navigation result
-        """
-        from datetime import datetime
+        # Get page information
+        title = await page.title()
+        final_url = page.url
         
+        return {
+            "success": True,
+            "url": final_url,
+            "requested_url": url,
+            "title": title,
+            "wait_for": wait_for,
+            "timeout": timeout,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "url": url,
+            "wait_for": wait_for,
+            "timeout": timeout,
+            "timestamp": datetime.now().isoformat()
+        }
+
+
+async def _click_and_verify(page: Page, bbox: List[int], verbose: bool = False) -> Dict[str, Any]:
+    """Click an element and record the page URL afterwards."""
+    result = await perform_click_action(page=page, bbox=bbox, verbose=verbose)
+    # Add verification - check if page state changed
+    if result.get("success"):
+        # perform_click_action has already waited for any navigation it started
+        result["page_url_after_click"] = page.url
+    return result
+
+
+async def _input_and_verify(page: Page, bbox: List[int], text: str, verbose: bool = False) -> Dict[str, Any]:
+    """Input text into an element and check the focused element's value."""
+    result = await perform_input_action(page=page, bbox=bbox, text=text, verbose=verbose)
+    # Add verification - check if text was actually input
+    if result.get("success"):
+        # Try to verify the input was successful
         try:
-            await self.page.goto(url, wait_until=wait_for, timeout=timeout)
-            
-            # Additional wait for dynamic content
-            await self.page.wait_for_timeout(2000)
-            
-            # Get page information
-            title = await self.page.title()
-            final_url = self.page.url
-            
-            return {
-                "success": True,
-                "url": final_url,
-                "requested_url": url,
-                "title": title,
-                "wait_for": wait_for,
-                "timeout": timeout,
-                "timestamp": datetime.now().isoformat()
+            # Get the focused element's value if possible
+            focused_value = await page.evaluate("document.activeElement.value || ''")
+            result["input_verification"] = {
+                "expected_text": text,
+                "actual_value": focused_value,
+                "text_matches": text.lower() in focused_value.lower()
             }
-            
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "url": url,
-                "wait_for": wait_for,
-                "timeout": timeout,
-                "timestamp": datetime.now().isoformat()
+        except:
+            result["input_verification"] = {"status": "could_not_verify"}
+    return result
+
+
+# Element types batch_analyze_and_act considers when the caller doesn't say
+_ACTION_ELEMENT_TYPES = {
+    "click": ("button", "link", "clickable"),
+    "input": ("input",),
+    "select": ("input", "clickable")
+}
+
+
+async def _analyze_and_act(
+    page: Page,
+    action: str,
+    element_types: List[str] = None,
+    label_contains: str = None,
+    text: str = None,
+    option_value: str = None,
+    include_elements: bool = False,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    """Analyze the viewport once and perform `action` on the first matching element."""
+    if action == "input" and text is None:
+        return {"success": False, "error": "text is required for the input action", "action": action}
+    if action == "select" and option_value is None:
+        return {"success": False, "error": "option_value is required for the select action", "action": action}
+    
+    types = tuple(element_types) if element_types else _ACTION_ELEMENT_TYPES[action]
+    analysis = await analyze_viewport_screenshot(
+        page=page,
+        include_description=False,
+        element_types=list(types),
+        verbose=verbose
+    )
+    if not analysis.get("success"):
+        return {"success": False, "error": analysis.get("error", "Analysis failed"), "action": action}
+    
+    elements = analysis.get("elements", [])
+    needle = label_contains.lower() if label_contains else None
+    target = next(
+        (e for e in elements
+         if e.get("type") in types and (needle is None or needle in e.get("label", "").lower())),
+        None
+    )
+    
+    if target is None:
+        result = {"success": False, "error": "No matching element found", "action": action}
+    else:
+        if action == "click":
+            action_result = await _click_and_verify(page, target["bbox"], verbose=verbose)
+        elif action == "input":
+            action_result = await _input_and_verify(page, target["bbox"], text, verbose=verbose)
+        else:
+            action_result = await perform_select_action(
+                page=page, bbox=target["bbox"], option_value=option_value, verbose=verbose
+            )
+        result = {
+            "success": action_result.get("success", False),
+            "action": action,
+            "target": target,
+            "action_result": action_result
+        }
+    
+    result["elements_found"] = len(elements)
+    if include_elements:
+        result["elements"] = elements
+    return result
+
+
+def _specialize(name: str, func, required: tuple, defaults: Dict[str, Any]):
+    """
+    Generate a caller for one tool that unpacks exactly its declared parameters.
+    
+    Required keys are read with params[...] (a missing one raises KeyError),
+    optional keys with params.get(..., default). Unknown keys are ignored.
+    Python-only extras are passed through as keyword arguments.
+    """
+    namespace = {"_func": func}
+    args = [f"{key}=params[{key!r}]" for key in required]
+    for i, (key, default) in enumerate(defaults.items()):
+        namespace[f"_default_{i}"] = default
+        args.append(f"{key}=params.get({key!r}, _default_{i})")
+    
+    fn_name = f"_call_{name}"
+    source = (
+        f"async def {fn_name}(page, params, extras):\n"
+        f"    return await _func(page=page, {', '.join(args)}, **extras)\n"
+    )
+    exec(source, namespace)
+    return namespace[fn_name]
+
+
+class SonnetWebTools:
+    """Tool execution handler for Claude Sonnet 3.7"""
+    
+    # tool name -> (function, required parameters, optional parameters with defaults)
+    _DISPATCH = {
+        "navigate_to_url": (
+            _navigate_to_url, ("url",), {"wait_for": "networkidle", "timeout": 30000}
+        ),
+        "analyze_viewport_screenshot": (
+            analyze_viewport_screenshot, (),
+            {
+                "page_url": None,
+                "include_description": True,
+                "element_types": _DEFAULT_ELEMENT_TYPES,
+                "verbose": False
+            }
+        ),
+        "perform_click_action": (_click_and_verify, ("bbox",), {"verbose": False}),
+        "perform_input_action": (_input_and_verify, ("bbox", "text"), {"verbose": False}),
+        "perform_select_action": (perform_select_action, ("bbox", "option_value"), {"verbose": False}),
+        "perform_scroll_action": (perform_scroll_action, ("x", "y"), {"verbose": False}),
+        "batch_analyze_and_act": (
+            _analyze_and_act, ("action",),
+            {
+                "element_types": None,
+                "label_contains": None,
+                "text": None,
+                "option_value": None,
+                "include_elements": False,
+                "verbose": False
             }
+        ),
+    }
+    # tool name -> generated async caller(page, parameters)
+    _SPECIALIZED = {name: _specialize(name, *entry) for name, entry in _DISPATCH.items()}
+    _checkers = _CHECKERS
+    
+    # All setup above happens once at import; an instance only binds a page
+    __slots__ = ("page",)
+    
+    def __init__(self, page: Page):
+        """Initialize with a Playwright page object."""
+        self.page = page
     
-    async def execute_tool(self, tool_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    async def execute_tool(self, tool_name: str, parameters: Dict[str, Any], **extras) -> Dict[str, Any]:
         """
         Execute a tool call from Claude Sonnet 3.7.
         
         Args:
             tool_name: Name of the tool to execute
             parameters: Parameters for the tool call
+            **extras: Python-only keyword arguments for the tool function (not validated, not exposed to the model)
             
         Returns:
             Dict containing the tool execution result
         """
-        try:
-            if tool_name == "navigate_to_url":
-                return await self._navigate_to_url(
-                    url=parameters["url"],
-                    wait_for=parameters.get("wait_for", "networkidle"),
-                    timeout=parameters.get("timeout", 30000)
-                )
-            
-            elif tool_name == "analyze_viewport_screenshot":
-                return await analyze_viewport_screenshot(
-                    page=self.page,
-                    page_url=parameters.get("page_url"),
-                    include_description=parameters.get("include_description", True),
-                    element_types=parameters.get("element_types", ["button", "input", "link", "clickable"]),
-                    verbose=parameters.get("verbose", False)
-                )
-            
-            elif tool_name == "perform_click_action":
-                result = await perform_click_action(
-                    page=self.page,
-                    bbox=parameters["bbox"],
-                    verbose=parameters.get("verbose", False)
-                )
-                # Add verification - check if page state changed
-                if result.get("success"):
-                    await self.page.wait_for_timeout(1000)  # Additional wait
-                    result["page_url_after_click"] = self.page.url
-                return result
-            
-            elif tool_name == "perform_input_action":
-                result = await perform_input_action(
-                    page=self.page,
-                    bbox=parameters["bbox"],
-                    text=parameters["text"],
-                    verbose=parameters.get("verbose", False)
-                )
-                # Add verification - check if text was actually input
-                if result.get("success"):
-                    await self.page.wait_for_timeout(500)  # Wait for input to be processed
-                    # Try to verify the input was successful
-                    try:
-                        # Get the focused element's value if possible
-                        focused_value = await self.page.evaluate("document.activeElement.value || ''")
-                        result["input_verification"] = {
-                            "expected_text": parameters["text"],
-                            "actual_value": focused_value,
-                            "text_matches": parameters["text"].lower() in focused_value.lower()
-                        }
-                    except:
-                        result["input_verification"] = {"status": "could_not_verify"}
-                return result
-            
-            elif tool_name == "perform_select_action":
-                return await perform_select_action(
-                    page=self.page,
-                    bbox=parameters["bbox"],
-                    option_value=parameters["option_value"],
-                    verbose=parameters.get("verbose", False)
-                )
-            
-            elif tool_name == "perform_scroll_action":
-                return await perform_scroll_action(
-                    page=self.page,
-                    x=parameters["x"],
-                    y=parameters["y"],
-                    verbose=parameters.get("verbose", False)
-                )
-            
-            else:
+        call = self._SPECIALIZED.get(tool_name)
+        if call is None:
+            return {
+                "success": False,
+                "error": f"Unknown tool: {tool_name}",
+                "available_tools": [tool["name"] for tool in SONNET_TOOLS]
+            }
+        
+        checker = self._checkers.get(tool_name)
+        if checker is not None:
+            try:
+                checker(parameters)
+            except fastjsonschema.JsonSchemaException as e:
                 return {
                     "success": False,
-                    "error": f"Unknown tool: {tool_name}",
-                    "available_tools": [tool["name"] for tool in SONNET_TOOLS]
+                    "error": f"Invalid parameters: {e.message}",
+                    "tool_name": tool_name,
+                    "parameters": parameters
                 }
+        
+        try:
+            return await call(self.page, parameters, extras)
                 
         except Exception as e:
             return {
@@ -324,8 +520,13 @@ class SonnetWebTools:
 
 
 def get_tools_for_sonnet() -> List[Dict]:
-    """Get the tool definitions formatted for Claude Sonnet 3.7."""
-    return SONNET_TOOLS
+    """Get the tool definitions formatted for Claude Sonnet 3.7 (a fresh, API-serializable copy)."""
+    return json.loads(_SONNET_TOOLS_JSON)
+
+
+def get_tools_for_sonnet_json() -> str:
+    """Get the tool definitions as a pre-serialized JSON string."""
+    return _SONNET_TOOLS_JSON
 
 
 def create_tool_handler(page: Page) -> SonnetWebTools:
@@ -361,21 +562,21 @@ async def example_sonnet_integration():
                 "verbose": True
             }
         )
-        print("Analysis Result:", json.dumps(analysis_result, indent=2))
+        print("Analysis Result:", _PRETTY(analysis_result))
         
         # 2. If there are input fields, fill one out
         if analysis_result.get("success") and analysis_result.get("elements"):
-            inputs = [e for e in analysis_result["elements"] if e["type"] == "input"]
-            if inputs:
+            first_input = next((e for e in analysis_result["elements"] if e["type"] == "input"), None)
+            if first_input:
                 input_result = await tool_handler.execute_tool(
                     "perform_input_action",
                     {
-                        "bbox": inputs[0]["bbox"],
+                        "bbox": first_input["bbox"],
                         "text": "test@example.com",
                         "verbose": True
                     }
                 )
-                print("Input Result:", json.dumps(input_result, indent=2))
+                print("Input Result:", _PRETTY(input_result))
         
         # 3. Scroll down to see more content
         scroll_result = await tool_handler.execute_tool(
@@ -386,7 +587,7 @@ async def example_sonnet_integration():
                 "verbose": True
             }
         )
-        print("Scroll Result:", json.dumps(scroll_result, indent=2))
+        print("Scroll Result:", _PRETTY(scroll_result))
         
         await browser.close()
 
@@ -458,7 +659,7 @@ async def chat_with_claude_and_tools(page, user_message):
 if __name__ == "__main__":
     # Print tool definitions for reference
     print("=== CLAUDE SONNET 3.7 TOOL DEFINITIONS ===")
-    print(json.dumps(get_tools_for_sonnet(), indent=2))
+    print(get_tools_for_sonnet_json())
     
     print("\n=== CLAUDE API INTEGRATION TEMPLATE ===")
     print(CLAUDE_API_TEMPLATE)
\ No newline at end of file
@@ -3,7 +3,6 @@
 Test the job discovery process with enhanced navigation following.
 """
 
-import asyncio
 import sys
 from dotenv import load_dotenv
 
@@ -13,6 +12,7 @@ load_dotenv(dotenv_path='.envfile')
 from playwright.async_api import async_playwright
 from job_page_discovery import discover_all_job_pages
 from config import get_openai_client, LLM_API_AVAILABLE
+from script_utils import run_async
 
 
 async def test_discovery(url: str):
@@ -100,4 +100,4 @@ if __name__ == "__main__":
     print("4. Handle intermediate navigation pages")
     print("-" * 60)
     
-    asyncio.run(test_discovery(test_url))
\ No newline at end of file
+    run_async(test_discovery(test_url))
\ No newline at end of file
@@ -4,11 +4,17 @@ Test job discovery on multiple websites.
 """
 
 import asyncio
+import glob
+import hashlib
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from urllib.parse import urlparse
 from simple_job_discovery import SimpleJobDiscovery
 from playwright.async_api import async_playwright
 from config import get_openai_client, LLM_API_AVAILABLE
+from script_utils import dump_json, run_async
 
 TEST_SITES = [
     "https://www.microsoft.com",
@@ -23,6 +29,51 @@ TEST_SITES = [
     "https://www.shopify.com"
 ]
 
+RESULTS_DIR = "test_results"
+STATE_DIR = f"{RESULTS_DIR}/state"
+CACHE_DIR = f"{RESULTS_DIR}/cache"
+os.makedirs(STATE_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+
+def _slug(url):
+    """Short site name used in result filenames, e.g. https://www.apple.com -> apple."""
+    return urlparse(url).netloc.removeprefix("www.").removesuffix(".com")
+
+
+_FILENAMES = {url: f"{RESULTS_DIR}/{_slug(url)}_discovery.json" for url in TEST_SITES}
+# Saved cookies/localStorage per site so consent banners stay dismissed across runs
+_STATE_FILES = {url: f"{STATE_DIR}/{_slug(url)}.json" for url in TEST_SITES}
+
+# Homepage fingerprint for the results cache: its links (href and text), sorted.
+# Unlike the raw HTML it ignores nonces, CSRF tokens and timestamps that change per load
+_HOMEPAGE_LINKS_JS = "() => Array.from(document.links, a => a.href + ' ' + a.innerText.trim()).sort().join('\\n')"
+
+
+def _store_cached_results(url, cache_file, results):
+    """Save results as the site's only cache entry, deleting ones for older fingerprints."""
+    dump_json(results, cache_file)
+    for path in glob.glob(f"{CACHE_DIR}/{_slug(url)}-*.json"):
+        if path != cache_file:
+            os.remove(path)
+
+# Subresources that never affect which links lead to job pages
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+
+async def _block_heavy_resources(route):
+    """Abort image/font/media requests, let everything else through."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+# Number of sites tested at the same time across all worker processes
+MAX_CONCURRENT_SITES = 4
+# Worker processes; each runs its share of the sites as tasks on one loop and
+# browser, so their vision requests can still be coalesced by the shared batcher
+WORKER_PROCESSES = 2
+
 async def test_site(page, url, client):
     """Test a single site."""
     print(f"\n{'='*60}")
@@ -32,17 +83,30 @@ async def test_site(page, url, client):
     discovery = SimpleJobDiscovery(client, verbose=True)
     
     try:
-        results = await discovery.discover(page, url, max_depth=3)
+        loop = asyncio.get_running_loop()
         
-        # Save individual results
-        domain = url.replace('https://', '').replace('http://', '').replace('www.', '').replace('.com', '')
-        filename = f"test_results/{domain}_discovery.json"
+        # Reuse earlier results while the homepage's links are unchanged
+        await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+        links = await page.evaluate(_HOMEPAGE_LINKS_JS)
+        digest = hashlib.blake2b(links.encode(), digest_size=16).hexdigest()
+        cache_file = f"{CACHE_DIR}/{_slug(url)}-{digest}.json"
         
-        import os
-        os.makedirs("test_results", exist_ok=True)
+        if os.path.exists(cache_file):
+            print(f"♻️ Homepage links unchanged, reusing {cache_file}")
+            with open(cache_file, encoding='utf-8') as f:
+                results = json.load(f)
+        else:
+            # The homepage is already loaded; don't fetch it a second time
+            results = await discovery.discover(page, url, max_depth=3, navigate=False)
+            # Only runs that found job pages are worth reusing; a miss is retried next time
+            if results['job_pages']:
+                await loop.run_in_executor(None, _store_cached_results, url, cache_file, results)
         
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
+        # Save individual results
+        filename = _FILENAMES.get(url) or f"{RESULTS_DIR}/{_slug(url)}_discovery.json"
+        
+        # Write on a worker thread so other sites keep driving their pages meanwhile
+        await loop.run_in_executor(None, dump_json, results, filename)
         
         return {
             'url': url,
@@ -62,6 +126,49 @@ async def test_site(page, url, client):
         }
 
 
+async def _run_site(browser, url, client):
+    """Test one site in a fresh context of the worker's browser."""
+    state_file = _STATE_FILES.get(url)
+    ctx = await browser.new_context(
+        viewport={"width": 1280, "height": 800},
+        storage_state=state_file if state_file and os.path.exists(state_file) else None
+    )
+    await ctx.route("**/*", _block_heavy_resources)
+    page = await ctx.new_page()
+    try:
+        result = await test_site(page, url, client)
+        if result['success'] and state_file:
+            await ctx.storage_state(path=state_file)
+        return result
+    finally:
+        await ctx.close()
+
+
+async def _run_sites_async(urls):
+    """Test several sites concurrently on one browser, closing it when done."""
+    client = get_openai_client()
+    sem = asyncio.Semaphore(max(1, MAX_CONCURRENT_SITES // WORKER_PROCESSES))
+    
+    async def run_one(url):
+        async with sem:
+            result = await _run_site(browser, url, client)
+            status = "✅" if result.get('success') else "❌"
+            print(f"\n{status} Finished {url}")
+            return result
+    
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)  # Run headless for faster testing
+        try:
+            return await asyncio.gather(*(run_one(url) for url in urls))
+        finally:
+            await browser.close()
+
+
+def run_sites(urls):
+    """Test a share of the sites inside a worker process. Returns their summary dicts."""
+    return run_async(_run_sites_async(urls))
+
+
 async def main():
     """Run tests on multiple sites."""
     
@@ -69,26 +176,18 @@ async def main():
         print("❌ Error: NEBIUS_API_KEY not found")
         return
     
-    client = get_openai_client()
-    
     print("🧪 Testing Job Discovery on Multiple Sites")
     print(f"Testing {len(TEST_SITES)} websites...")
     
-    all_results = []
+    # Each worker has its own interpreter, loop and browser, so response
+    # parsing in one share of the sites never stalls the others on the GIL
+    loop = asyncio.get_running_loop()
+    shares = [TEST_SITES[i::WORKER_PROCESSES] for i in range(WORKER_PROCESSES)]
+    with ProcessPoolExecutor(max_workers=WORKER_PROCESSES) as executor:
+        futures = [loop.run_in_executor(executor, run_sites, share) for share in shares if share]
+        all_results = [result for results in await asyncio.gather(*futures) for result in results]
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)  # Run headless for faster testing
-        
-        for site in TEST_SITES:
-            # Create new page for each site
-            page = await browser.new_page(viewport={"width": 1280, "height": 800})
-            
-            result = await test_site(page, site, client)
-            all_results.append(result)
-            
-            await page.close()
-        
-        await browser.close()
+    all_results.sort(key=lambda r: TEST_SITES.index(r['url']))
     
     # Print summary
     print("\n" + "="*60)
@@ -117,17 +216,16 @@ async def main():
             print(f"  - {result['url']} (visited {result['pages_visited']} pages)")
     
     # Save combined results
-    with open('test_results/all_sites_summary.json', 'w') as f:
-        json.dump({
-            'timestamp': datetime.now().isoformat(),
-            'total_sites': len(TEST_SITES),
-            'successful': len(successful),
-            'with_job_pages': len(found_jobs),
-            'results': all_results
-        }, f, indent=2)
+    dump_json({
+        'timestamp': datetime.now().isoformat(),
+        'total_sites': len(TEST_SITES),
+        'successful': len(successful),
+        'with_job_pages': len(found_jobs),
+        'results': all_results
+    }, f'{RESULTS_DIR}/all_sites_summary.json')
     
     print(f"\n💾 Results saved to test_results/")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run_async(main())
\ No newline at end of file
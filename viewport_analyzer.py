@@ -7,22 +7,243 @@ Takes a screenshot of the current viewport and identifies interactive elements w
 """
 
 import asyncio
-import base64
+import hashlib
 import json
 import os
+import re
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Dict, Optional, Set
-from playwright.async_api import Page
+from functools import lru_cache
+from typing import Awaitable, Callable, List, Dict, Optional, Set
+from urllib.parse import urlparse
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 from dotenv import load_dotenv
 
+try:
+    # SIMD base64 (AVX2/AVX-512); same API as the stdlib module
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    import fastjsonschema
+    FASTJSONSCHEMA_AVAILABLE = True
+except ImportError:
+    FASTJSONSCHEMA_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import cv2
+    CV2_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    CV2_AVAILABLE = False
+
 # Load environment variables before importing config
 load_dotenv(dotenv_path='.envfile')
 
-from config import get_openai_client
+from config import get_openai_client, SCREENSHOT_BASE_URL
+from vision_batcher import get_vision_batcher
 
 # Configuration
 VISION_MODEL = "Qwen/Qwen2.5-VL-72B-Instruct"
 
+# Successful analyses reused for the same URL, viewport, scroll offset, DOM state and request options
+ANALYSIS_CACHE_SIZE = 256
+_analysis_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+
+# After a click: how long to wait for a navigation to start, then for it to reach DOMContentLoaded
+CLICK_NAVIGATION_WAIT_MS = 500
+CLICK_LOAD_WAIT_MS = 1500
+# How long select strategies look for a <select> or option text before trying the next one
+SELECT_LOCATE_TIMEOUT_MS = 2000
+
+# Where analyzed screenshots are saved; created once per analyzer
+SCREENSHOT_DIR = "screenshots"
+
+# Upper bound on waiting for a scroll or typed value to land before returning anyway
+ACTION_SETTLE_TIMEOUT_MS = 1000
+
+# True once the window sits at the requested scroll offset, clamped to the
+# scrollable range (short pages can't reach large offsets; smooth scrolling animates)
+_SCROLL_SETTLED_JS = """([x, y]) => {
+    const el = document.scrollingElement || document.documentElement;
+    const tx = Math.max(0, Math.min(x, el.scrollWidth - window.innerWidth));
+    const ty = Math.max(0, Math.min(y, el.scrollHeight - window.innerHeight));
+    return Math.abs(window.scrollX - tx) < 1 && Math.abs(window.scrollY - ty) < 1;
+}"""
+
+# Screenshots for the model are JPEG: several times smaller than PNG to encode and upload
+SCREENSHOT_JPEG_QUALITY = 80
+
+# Width screenshots are shrunk to before upload (needs OpenCV); the model's
+# bboxes are scaled back to page pixels when parsed
+VLM_IMAGE_WIDTH = 896
+
+# Answers with at least this many elements get their bboxes checked and
+# rescaled as one NumPy array; below it the per-element loop is cheaper
+VECTORIZE_MIN_ELEMENTS = 64
+
+# Parsed model answers per ViewportAnalyzer, keyed by screenshot content and prompt
+SCREENSHOT_CACHE_SIZE = 256
+# Encoded (downscaled, base64) model images per ViewportAnalyzer, keyed by screenshot content
+ENCODED_IMAGE_CACHE_SIZE = 64
+
+# Scroll offset plus a cheap fingerprint of the interactive DOM (element count,
+# tag histogram, first 50 labels), so in-page changes without a URL change miss the cache
+_VIEW_STATE_JS = """() => {
+    const els = document.querySelectorAll('a,button,input,select,textarea,[role],[onclick]');
+    const tags = {};
+    const labels = [];
+    els.forEach((el, i) => {
+        tags[el.tagName] = (tags[el.tagName] || 0) + 1;
+        if (i < 50) labels.push((el.getAttribute('aria-label') || el.value || el.textContent || '').trim().slice(0, 40));
+    });
+    return [window.pageYOffset, els.length + '|' + JSON.stringify(tags) + '|' + labels.join('|')];
+}"""
+
+# Shape of a vision model answer; same rules as _parse_vision_response/_validate_element
+ELEMENT_TYPES = ("button", "input", "link", "clickable")
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "required": ["elements"],
+    "properties": {
+        "elements": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["type", "label", "bbox", "semantic_role"],
+                "properties": {
+                    "type": {"enum": list(ELEMENT_TYPES)},
+                    "bbox": {
+                        "type": "array",
+                        "minItems": 4,
+                        "maxItems": 4,
+                        "items": {"type": "number", "minimum": 0}
+                    }
+                }
+            }
+        }
+    }
+}
+
+# Compiled once; without fastjsonschema the hand-written checks are used
+_check_analysis = fastjsonschema.compile(ANALYSIS_SCHEMA) if FASTJSONSCHEMA_AVAILABLE else None
+
+# A ``` or ```json fence anywhere in the response (prose around it is ignored); group 1 is the content
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+
+# Prompt wording for each requestable element type
+ELEMENT_DESCRIPTIONS = {
+    "button": "Buttons (submit, cancel, action buttons, etc.)",
+    "input": "Input fields (text, email, password, search, etc.)",
+    "link": "Links and navigation elements",
+    "clickable": "Other clickable elements (tabs, toggles, etc.)",
+    "form": "Form elements and containers",
+    "navigation": "Navigation menus and breadcrumbs",
+    "all": "All interactive elements"
+}
+
+
+@lru_cache(maxsize=32)
+def _build_analysis_prompt(element_types: tuple, include_description: bool) -> str:
+    """Analysis prompt for the given element types (order kept) and description flag."""
+    # Build element type description
+    if "all" in element_types:
+        elements_to_find = "all interactive elements including buttons, inputs, links, and any clickable elements"
+    else:
+        descriptions = [ELEMENT_DESCRIPTIONS.get(t, t) for t in element_types]
+        elements_to_find = ", ".join(descriptions)
+
+    prompt = f"""Analyze this webpage screenshot and identify {elements_to_find}.
+
+For each interactive element, provide:
+1. Element type: button, input, link, or clickable
+2. Visible text/label (or aria-label if no visible text)
+3. Bounding box coordinates as [x, y, width, height] where x,y is top-left corner
+4. Semantic role/purpose (e.g., "submit_button", "email_input", "navigation_link")
+5. Relevant attributes if visible (placeholder text, button type, etc.)
+
+{"Also provide a brief description of what the webpage shows." if include_description else ""}
+
+Return ONLY a JSON object in this exact format:
+{{
+  {"\"description\": \"Brief description of the webpage content and layout\"," if include_description else ""}
+  "elements": [
+    {{
+      "type": "button|input|link|clickable",
+      "label": "visible text or descriptive label",
+      "bbox": [x, y, width, height],
+      "semantic_role": "descriptive_purpose",
+      "attributes": {{"key": "value"}}
+    }}
+  ]
+}}
+
+If no interactive elements are found, return: {{"elements": []}}"""
+
+    return prompt
+
+
+def _downscale_for_model(screenshot_bytes: bytes):
+    """
+    Shrink a screenshot to VLM_IMAGE_WIDTH pixels wide (JPEG).
+    
+    Returns:
+        (image bytes, factor that maps model coordinates back to page pixels)
+    """
+    if not CV2_AVAILABLE:
+        return screenshot_bytes, 1.0
+    image = cv2.imdecode(np.frombuffer(screenshot_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if image is None or image.shape[1] <= VLM_IMAGE_WIDTH:
+        return screenshot_bytes, 1.0
+    
+    height, width = image.shape[:2]
+    factor = width / VLM_IMAGE_WIDTH
+    small = cv2.resize(image, (VLM_IMAGE_WIDTH, round(height / factor)), interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, SCREENSHOT_JPEG_QUALITY])
+    if not ok:
+        return screenshot_bytes, 1.0
+    return encoded.tobytes(), factor
+
+
+def _bbox_center(bbox: List[int]):
+    """Center (x, y) of an [x, y, width, height] bbox; the point every action clicks."""
+    if not bbox or len(bbox) != 4:
+        raise ValueError("bbox must be [x, y, width, height]")
+    x, y, w, h = bbox
+    return x + w // 2, y + h // 2
+
+
+@lru_cache(maxsize=256)
+def _domain_from_url(url: str) -> str:
+    """Filename-safe host[:port] of a page URL, parsed once per URL."""
+    return urlparse(url).netloc.replace(":", "_")
+
+
+def _bbox_array(elements: List[Dict]):
+    """Stack element bboxes into an (N, 4) array, checking they are non-negative numbers."""
+    try:
+        boxes = np.asarray([element["bbox"] for element in elements])
+    except ValueError:
+        boxes = None
+    if boxes is None or boxes.ndim != 2 or boxes.shape[1] != 4 or boxes.dtype.kind not in "iuf":
+        raise ValueError("Element bboxes must be [x, y, width, height] lists of numbers")
+    if (boxes < 0).any():
+        raise ValueError("Element bbox values must be non-negative numbers")
+    return boxes
+
+
 class ViewportAnalyzer:
     """Analyzes webpage screenshots and performs actions on interactive elements."""
     
@@ -35,13 +256,20 @@ class ViewportAnalyzer:
             raise ValueError(
                 "No OpenAI client available. Please ensure NEBIUS_API_KEY is set in .envfile"
             )
+        self.batcher = get_vision_batcher(self.client)
+        # Link the model to the saved screenshot instead of inlining it as base64
+        self.use_url_upload = bool(SCREENSHOT_BASE_URL)
+        self._screenshot_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._encoded_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+        os.makedirs(SCREENSHOT_DIR, exist_ok=True)
         
     async def analyze_viewport_screenshot(
         self, 
         page: Page, 
         page_url: str = None,
         include_description: bool = True,
-        element_types: List[str] = None
+        element_types: List[str] = None,
+        screenshot_bytes: bytes = None
     ) -> Dict:
         """
         Analyze current viewport screenshot and identify interactive elements.
@@ -51,6 +279,7 @@ class ViewportAnalyzer:
             page_url: URL of the current page
             include_description: Whether to include text description
             element_types: Types of elements to detect
+            screenshot_bytes: Viewport PNG/JPEG already captured by the caller (taken from page if None)
             
         Returns:
             Dict containing analysis results with elements and their bounding boxes
@@ -63,12 +292,22 @@ class ViewportAnalyzer:
             if not page_url:
                 page_url = page.url
                 
-            # Take viewport screenshot
-            screenshot_bytes = await page.screenshot(full_page=False)
-            screenshot_path = self._save_screenshot(page_url, screenshot_bytes)
+            # Take viewport screenshot unless the caller already has one
+            if screenshot_bytes is None:
+                screenshot_bytes = await page.screenshot(
+                    full_page=False,
+                    type="jpeg",
+                    quality=SCREENSHOT_JPEG_QUALITY,
+                    scale="css"  # one image pixel per CSS pixel, even on HiDPI
+                )
             
-            # Convert to base64 for vision model
-            screenshot_base64 = base64.b64encode(screenshot_bytes).decode()
+            # One clock read names the saved file and stamps the result
+            captured_at = datetime.now()
+            
+            # Write the screenshot to disk in a thread while the model call is in flight
+            save_task = asyncio.create_task(
+                asyncio.to_thread(self._save_screenshot, page_url, screenshot_bytes, captured_at)
+            )
             
             # Get viewport size
             viewport_size = page.viewport_size or {"width": 1280, "height": 800}
@@ -76,19 +315,40 @@ class ViewportAnalyzer:
             # Create prompt based on requested element types
             prompt = self._create_analysis_prompt(element_types, include_description)
             
-            # Call vision model
-            response = await self._call_vision_model(prompt, screenshot_base64)
-            
-            # Parse and validate response
-            analysis_result = self._parse_vision_response(response)
+            # An identical screenshot with the same prompt gets the same answer
+            digest = hashlib.blake2b(screenshot_bytes, digest_size=16).digest()
+            cache_key = (digest, prompt)
+            analysis_result = self._screenshot_cache.get(cache_key)
+            if analysis_result is not None:
+                self._screenshot_cache.move_to_end(cache_key)
+                if self.verbose:
+                    print(f"[ViewportAnalyzer] Screenshot unchanged, reusing analysis for {page_url}")
+            else:
+                # URL mode needs the file on disk before the model fetches it
+                screenshot_path = await save_task if self.use_url_upload else None
+                if screenshot_path:
+                    image = f"{SCREENSHOT_BASE_URL.rstrip('/')}/{os.path.basename(screenshot_path)}"
+                    bbox_scale = 1.0
+                else:
+                    image, bbox_scale = await self._encode_for_model(digest, screenshot_bytes)
+                
+                # Call vision model
+                response = await self._call_vision_model(prompt, image)
+                
+                # Parse and validate response
+                analysis_result = self._parse_vision_response(response, bbox_scale)
+                
+                self._screenshot_cache[cache_key] = analysis_result
+                if len(self._screenshot_cache) > SCREENSHOT_CACHE_SIZE:
+                    self._screenshot_cache.popitem(last=False)
             
             # Add metadata
             result = {
                 "success": True,
-                "screenshot_path": screenshot_path,
+                "screenshot_path": await save_task,
                 "page_url": page_url,
                 "viewport_size": viewport_size,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": captured_at.isoformat(),
                 **analysis_result
             }
             
@@ -161,23 +421,29 @@ class ViewportAnalyzer:
     
     async def _perform_click(self, page: Page, bbox: List[int]) -> Dict:
         """Click on an element using its bounding box."""
-        if not bbox or len(bbox) != 4:
-            raise ValueError("bbox must be [x, y, width, height]")
-            
         # Calculate click coordinates (center of bbox)
-        click_x = bbox[0] + bbox[2] // 2
-        click_y = bbox[1] + bbox[3] // 2
+        click_x, click_y = _bbox_center(bbox)
+        
+        # Listen for a main-frame navigation before clicking so a fast one isn't missed
+        navigation = asyncio.create_task(page.wait_for_event(
+            "framenavigated",
+            predicate=lambda frame: frame == page.main_frame,
+            timeout=CLICK_NAVIGATION_WAIT_MS
+        ))
         
         # Perform click
-        await page.mouse.click(click_x, click_y)
+        try:
+            await page.mouse.click(click_x, click_y)
+        except BaseException:
+            navigation.cancel()
+            raise
         
-        # Wait for potential page changes or navigation
+        # Return as soon as a navigation is usable, or quickly when the click didn't navigate
         try:
-            # Wait for either navigation or timeout
-            await page.wait_for_load_state("networkidle", timeout=5000)
-        except:
-            # If no navigation, just wait for potential dynamic changes
-            await page.wait_for_timeout(2000)
+            await navigation
+            await page.wait_for_load_state("domcontentloaded", timeout=CLICK_LOAD_WAIT_MS)
+        except PlaywrightTimeoutError:
+            pass
         
         if self.verbose:
             print(f"[ViewportAnalyzer] Clicked at ({click_x}, {click_y})")
@@ -192,24 +458,27 @@ class ViewportAnalyzer:
     
     async def _perform_input(self, page: Page, bbox: List[int], text: str) -> Dict:
         """Input text into an element using its bounding box."""
-        if not bbox or len(bbox) != 4:
-            raise ValueError("bbox must be [x, y, width, height]")
+        # Calculate click coordinates (center of bbox)
+        click_x, click_y = _bbox_center(bbox)
         if not text:
             raise ValueError("text is required for input action")
-            
-        # Calculate click coordinates (center of bbox)
-        click_x = bbox[0] + bbox[2] // 2
-        click_y = bbox[1] + bbox[3] // 2
         
-        # Click to focus the input field
+        # Click to focus the input field; focus moves on mousedown, so no wait is needed
         await page.mouse.click(click_x, click_y)
-        await page.wait_for_timeout(1000)  # Increased wait time
         
-        # Clear existing text and type new text
+        # Clear existing text and type new text (each key is delivered before type() returns)
         await page.keyboard.press("Control+a")  # Select all
-        await page.wait_for_timeout(200)
         await page.keyboard.type(text)
-        await page.wait_for_timeout(500)  # Wait for text to be processed
+        
+        # Give frameworks that re-render controlled inputs a moment to settle on the value
+        try:
+            await page.wait_for_function(
+                "text => (document.activeElement && document.activeElement.value) === text",
+                arg=text,
+                timeout=ACTION_SETTLE_TIMEOUT_MS
+            )
+        except PlaywrightTimeoutError:
+            pass  # masked/formatted inputs may never match exactly
         
         if self.verbose:
             print(f"[ViewportAnalyzer] Typed '{text}' at ({click_x}, {click_y})")
@@ -225,27 +494,26 @@ class ViewportAnalyzer:
     
     async def _perform_select(self, page: Page, bbox: List[int], option_value: str) -> Dict:
         """Select an option from a dropdown using its bounding box."""
-        if not bbox or len(bbox) != 4:
-            raise ValueError("bbox must be [x, y, width, height]")
+        # Calculate click coordinates (center of bbox)
+        click_x, click_y = _bbox_center(bbox)
         if not option_value:
             raise ValueError("option_value is required for select action")
-            
-        # Calculate click coordinates (center of bbox)
-        click_x = bbox[0] + bbox[2] // 2
-        click_y = bbox[1] + bbox[3] // 2
         
         # Click to open dropdown
         await page.mouse.click(click_x, click_y)
-        await page.wait_for_timeout(500)
         
-        # Try to find and select the option
+        # Try to find and select the option; both lookups auto-wait, but only briefly
         try:
             # Method 1: Try direct selection by value
-            await page.select_option(f'xpath=//select[contains(@style, "position") or @class]', option_value)
+            await page.select_option(
+                f'xpath=//select[contains(@style, "position") or @class]',
+                option_value,
+                timeout=SELECT_LOCATE_TIMEOUT_MS
+            )
         except:
             try:
                 # Method 2: Try clicking on option text
-                await page.click(f'text="{option_value}"')
+                await page.click(f'text="{option_value}"', timeout=SELECT_LOCATE_TIMEOUT_MS)
             except:
                 # Method 3: Use keyboard navigation
                 await page.keyboard.type(option_value)
@@ -270,7 +538,10 @@ class ViewportAnalyzer:
             
         # Scroll to coordinates
         await page.evaluate(f"window.scrollTo({x}, {y})")
-        await page.wait_for_timeout(1000)  # Wait for scroll to complete
+        try:
+            await page.wait_for_function(_SCROLL_SETTLED_JS, arg=[x, y], timeout=ACTION_SETTLE_TIMEOUT_MS)
+        except PlaywrightTimeoutError:
+            pass
         
         if self.verbose:
             print(f"[ViewportAnalyzer] Scrolled to ({x}, {y})")
@@ -284,75 +555,29 @@ class ViewportAnalyzer:
     
     def _create_analysis_prompt(self, element_types: List[str], include_description: bool) -> str:
         """Create prompt for vision model based on requested analysis."""
-        
-        element_descriptions = {
-            "button": "Buttons (submit, cancel, action buttons, etc.)",
-            "input": "Input fields (text, email, password, search, etc.)",
-            "link": "Links and navigation elements",
-            "clickable": "Other clickable elements (tabs, toggles, etc.)",
-            "form": "Form elements and containers",
-            "navigation": "Navigation menus and breadcrumbs",
-            "all": "All interactive elements"
-        }
-        
-        # Build element type description
-        if "all" in element_types:
-            elements_to_find = "all interactive elements including buttons, inputs, links, and any clickable elements"
-        else:
-            descriptions = [element_descriptions.get(t, t) for t in element_types]
-            elements_to_find = ", ".join(descriptions)
-        
-        prompt = f"""Analyze this webpage screenshot and identify {elements_to_find}.
-
-For each interactive element, provide:
-1. Element type: button, input, link, or clickable
-2. Visible text/label (or aria-label if no visible text)
-3. Bounding box coordinates as [x, y, width, height] where x,y is top-left corner
-4. Semantic role/purpose (e.g., "submit_button", "email_input", "navigation_link")
-5. Relevant attributes if visible (placeholder text, button type, etc.)
-
-{"Also provide a brief description of what the webpage shows." if include_description else ""}
-
-Return ONLY a JSON object in this exact format:
-{{
-  {"\"description\": \"Brief description of the webpage content and layout\"," if include_description else ""}
-  "elements": [
-    {{
-      "type": "button|input|link|clickable",
-      "label": "visible text or descriptive label",
-      "bbox": [x, y, width, height],
-      "semantic_role": "descriptive_purpose",
-      "attributes": {{"key": "value"}}
-    }}
-  ]
-}}
-
-If no interactive elements are found, return: {{"elements": []}}"""
-
-        return prompt
+        return _build_analysis_prompt(tuple(element_types), include_description)
+    
+    async def _encode_for_model(self, digest: bytes, screenshot_bytes: bytes):
+        """Downscaled base64 image and bbox scale for a screenshot, reused for repeat screenshots."""
+        encoded = self._encoded_cache.get(digest)
+        if encoded is not None:
+            self._encoded_cache.move_to_end(digest)
+            return encoded
+        
+        # Smaller image: fewer bytes to encode and upload, fewer vision tokens
+        model_bytes, bbox_scale = await asyncio.to_thread(_downscale_for_model, screenshot_bytes)
+        # Convert to base64 for vision model
+        encoded = (base64.b64encode(model_bytes).decode('ascii'), bbox_scale)
+        
+        self._encoded_cache[digest] = encoded
+        if len(self._encoded_cache) > ENCODED_IMAGE_CACHE_SIZE:
+            self._encoded_cache.popitem(last=False)
+        return encoded
     
     async def _call_vision_model(self, prompt: str, screenshot_base64: str) -> str:
-        """Call the vision model with prompt and screenshot."""
-        
-        response = self.client.chat.completions.create(
-            model=VISION_MODEL,
-            temperature=0.1,
-            max_tokens=2000,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": f"data:image/png;base64,{screenshot_base64}"}
-                        }
-                    ]
-                }
-            ]
-        )
-        
-        result = response.choices[0].message.content.strip()
+        """Call the vision model with prompt and screenshot (base64 or http(s) URL) in a worker thread."""
+        # Never batched: the element bboxes in the answer are clicked, so they must come from this page
+        result = await self.batcher.submit(prompt, screenshot_base64, max_tokens=2000, batch=False)
         
         if self.verbose:
             print(f"[ViewportAnalyzer] Vision model raw response:")
@@ -361,45 +586,65 @@ If no interactive elements are found, return: {{"elements": []}}"""
             
         return result
     
-    def _parse_vision_response(self, response: str) -> Dict:
-        """Parse and validate vision model response."""
+    def _parse_vision_response(self, response: str, bbox_scale: float = 1.0) -> Dict:
+        """Parse and validate vision model response (bboxes multiplied by bbox_scale)."""
         
         # Extract JSON from markdown code blocks if present
-        if response.startswith('```json'):
-            start = response.find('```json') + 7
-            end = response.rfind('```')
-            if end > start:
-                response = response[start:end].strip()
-        elif response.startswith('```'):
-            start = response.find('```') + 3
-            end = response.rfind('```')
-            if end > start:
-                response = response[start:end].strip()
+        match = _FENCE_RE.search(response)
+        if match:
+            response = match.group(1)
         
         try:
-            parsed = json.loads(response)
-            
-            # Validate structure
-            if not isinstance(parsed, dict):
-                raise ValueError("Response must be a JSON object")
-                
-            if "elements" not in parsed:
-                raise ValueError("Response must contain 'elements' field")
-                
-            if not isinstance(parsed["elements"], list):
-                raise ValueError("'elements' must be a list")
-            
-            # Validate each element
-            for i, element in enumerate(parsed["elements"]):
-                self._validate_element(element, i)
+            parsed = _json_loads(response)
+            
+            if _check_analysis is not None:
+                # One compiled check for the whole answer
+                try:
+                    _check_analysis(parsed)
+                except fastjsonschema.JsonSchemaException as e:
+                    raise ValueError(f"Invalid vision response: {e.message}")
+            else:
+                # Validate structure
+                if not isinstance(parsed, dict):
+                    raise ValueError("Response must be a JSON object")
+                    
+                if "elements" not in parsed:
+                    raise ValueError("Response must contain 'elements' field")
+                    
+                if not isinstance(parsed["elements"], list):
+                    raise ValueError("'elements' must be a list")
+            
+            elements = parsed["elements"]
+            vectorize = NUMPY_AVAILABLE and len(elements) >= VECTORIZE_MIN_ELEMENTS
+            if _check_analysis is None:
+                for i, element in enumerate(elements):
+                    self._validate_element(element, i, check_bbox=not vectorize)
+            
+            # Map bboxes back to page pixels and precompute each element's
+            # click point (_bbox_center, as the actions use)
+            if vectorize:
+                boxes = _bbox_array(elements)
+                if bbox_scale != 1.0:
+                    boxes = np.rint(boxes * bbox_scale).astype(np.int64)
+                    for element, bbox in zip(elements, boxes.tolist()):
+                        element["bbox"] = bbox
+                centers = (boxes[:, :2] + boxes[:, 2:] // 2).astype(np.int64).tolist()
+                for element, center in zip(elements, centers):
+                    element["center"] = center
+            else:
+                for element in elements:
+                    if bbox_scale != 1.0:
+                        element["bbox"] = [round(v * bbox_scale) for v in element["bbox"]]
+                    x, y = _bbox_center(element["bbox"])
+                    element["center"] = [int(x), int(y)]
             
             return parsed
             
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON response: {e}")
     
-    def _validate_element(self, element: Dict, index: int):
-        """Validate individual element structure."""
+    def _validate_element(self, element: Dict, index: int, check_bbox: bool = True):
+        """Validate individual element structure (bbox values too unless check_bbox is False)."""
         
         required_fields = ["type", "label", "bbox", "semantic_role"]
         for field in required_fields:
@@ -407,10 +652,12 @@ If no interactive elements are found, return: {{"elements": []}}"""
                 raise ValueError(f"Element {index} missing required field: {field}")
         
         # Validate element type
-        valid_types = ["button", "input", "link", "clickable"]
-        if element["type"] not in valid_types:
+        if element["type"] not in ELEMENT_TYPES:
             raise ValueError(f"Element {index} has invalid type: {element['type']}")
         
+        if not check_bbox:
+            return
+        
         # Validate bbox format
         bbox = element["bbox"]
         if not isinstance(bbox, list) or len(bbox) != 4:
@@ -419,16 +666,21 @@ If no interactive elements are found, return: {{"elements": []}}"""
         if not all(isinstance(x, (int, float)) and x >= 0 for x in bbox):
             raise ValueError(f"Element {index} bbox values must be non-negative numbers")
     
-    def _save_screenshot(self, url: str, screenshot_bytes: bytes) -> str:
-        """Save screenshot and return path."""
+    def _save_screenshot(self, url: str, screenshot_bytes: bytes, captured_at: datetime = None) -> str:
+        """
+        Save screenshot and return path (named after captured_at, default now).
+        
+        A content digest in the name keeps screenshots taken in the same second apart,
+        so in URL mode the model always fetches the image that was analysed.
+        """
         try:
-            from urllib.parse import urlparse
-            domain = urlparse(url).netloc.replace(":", "_")
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            domain = _domain_from_url(url)
+            timestamp = (captured_at or datetime.now()).strftime("%Y%m%d_%H%M%S")
+            digest = hashlib.blake2b(screenshot_bytes, digest_size=6).hexdigest()
             
-            os.makedirs("screenshots", exist_ok=True)
-            filename = f"{domain}_viewport_{timestamp}.png"
-            path = f"screenshots/{filename}"
+            extension = "jpg" if screenshot_bytes[:2] == b"\xff\xd8" else "png"
+            filename = f"{domain}_viewport_{timestamp}_{digest}.{extension}"
+            path = f"{SCREENSHOT_DIR}/{filename}"
             
             with open(path, "wb") as f:
                 f.write(screenshot_bytes)
@@ -442,12 +694,39 @@ If no interactive elements are found, return: {{"elements": []}}"""
 
 
 # Tool interface for agent models
+_analyzers: Dict[bool, ViewportAnalyzer] = {}
+
+
+def get_analyzer(verbose: bool = False) -> ViewportAnalyzer:
+    """Shared ViewportAnalyzer (and its OpenAI client) for the given verbosity."""
+    analyzer = _analyzers.get(verbose)
+    if analyzer is None:
+        analyzer = _analyzers[verbose] = ViewportAnalyzer(verbose=verbose)
+    return analyzer
+
+
+def _invalidate_analyses(url: str):
+    """Drop cached analyses for a page whose content an action may have changed."""
+    for key in [key for key in _analysis_cache if key[0] == url]:
+        del _analysis_cache[key]
+
+
+def _copy_analysis(result: Dict) -> Dict:
+    """Copy of a cached analysis that callers can annotate without touching the cache."""
+    copy = dict(result)
+    if "elements" in copy:
+        copy["elements"] = [dict(element) for element in copy["elements"]]
+    return copy
+
+
 async def analyze_viewport_screenshot(
     page: Page,
     page_url: str = None,
     include_description: bool = True,
     element_types: List[str] = None,
-    verbose: bool = False
+    verbose: bool = False,
+    screenshot_bytes: bytes = None,
+    capture: Callable[[], Awaitable[bytes]] = None
 ) -> Dict:
     """
     Tool function that agent models can call to analyze viewport screenshots.
@@ -458,6 +737,8 @@ async def analyze_viewport_screenshot(
         include_description: Whether to include text description of the page
         element_types: List of element types to detect (button, input, link, clickable, form, navigation, all)
         verbose: Whether to print debug information
+        screenshot_bytes: Viewport PNG/JPEG already captured by the caller (optional, not exposed to the model)
+        capture: Async callable returning viewport PNG/JPEG bytes, awaited only on a cache miss (optional, not exposed to the model)
         
     Returns:
         Dict containing:
@@ -465,18 +746,57 @@ async def analyze_viewport_screenshot(
         - screenshot_path: str (path to saved screenshot)
         - page_url: str
         - description: str (if include_description=True)
-        - elements: List[Dict] (detected interactive elements with bboxes)
+        - elements: List[Dict] (detected interactive elements with bboxes and click centers)
         - viewport_size: Dict (width, height)
         - timestamp: str (ISO format)
         - error: str (if success=False)
     """
-    analyzer = ViewportAnalyzer(verbose=verbose)
-    return await analyzer.analyze_viewport_screenshot(
+    viewport_size = page.viewport_size or {"width": 1280, "height": 800}
+    try:
+        scroll_y, dom_state = await page.evaluate(_VIEW_STATE_JS)
+    except Exception as e:
+        if verbose:
+            print(f"[ViewportAnalyzer] Error reading view state of {page_url or page.url}: {e}")
+        return {
+            "success": False,
+            "error": str(e),
+            "page_url": page_url or page.url,
+            "timestamp": datetime.now().isoformat()
+        }
+    key = (
+        page_url or page.url,
+        viewport_size["width"],
+        viewport_size["height"],
+        scroll_y,
+        hashlib.sha1(dom_state.encode()).hexdigest(),
+        include_description,
+        tuple(element_types) if element_types is not None else None
+    )
+    
+    cached = _analysis_cache.get(key)
+    if cached is not None:
+        _analysis_cache.move_to_end(key)
+        if verbose:
+            print(f"[ViewportAnalyzer] Reusing analysis for {key[0]}")
+        return _copy_analysis(cached)
+    
+    if screenshot_bytes is None and capture is not None:
+        screenshot_bytes = await capture()
+    
+    analyzer = get_analyzer(verbose)
+    result = await analyzer.analyze_viewport_screenshot(
         page=page,
         page_url=page_url,
         include_description=include_description,
-        element_types=element_types
+        element_types=element_types,
+        screenshot_bytes=screenshot_bytes
     )
+    
+    if result.get("success"):
+        _analysis_cache[key] = result
+        if len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+    return _copy_analysis(result)
 
 
 async def perform_click_action(
@@ -495,7 +815,8 @@ async def perform_click_action(
     Returns:
         Dict containing action result
     """
-    analyzer = ViewportAnalyzer(verbose=verbose)
+    _invalidate_analyses(page.url)
+    analyzer = get_analyzer(verbose)
     return await analyzer.perform_action(page, "click", bbox=bbox)
 
 
@@ -517,7 +838,8 @@ async def perform_input_action(
     Returns:
         Dict containing action result
     """
-    analyzer = ViewportAnalyzer(verbose=verbose)
+    _invalidate_analyses(page.url)
+    analyzer = get_analyzer(verbose)
     return await analyzer.perform_action(page, "input", bbox=bbox, text=text)
 
 
@@ -539,7 +861,8 @@ async def perform_select_action(
     Returns:
         Dict containing action result
     """
-    analyzer = ViewportAnalyzer(verbose=verbose)
+    _invalidate_analyses(page.url)
+    analyzer = get_analyzer(verbose)
     return await analyzer.perform_action(page, "select", bbox=bbox, option_value=option_value)
 
 
@@ -561,18 +884,19 @@ async def perform_scroll_action(
     Returns:
         Dict containing action result
     """
-    analyzer = ViewportAnalyzer(verbose=verbose)
+    analyzer = get_analyzer(verbose)
     return await analyzer.perform_action(page, "scroll", x=x, y=y)
 
 
 # Example usage
 async def main():
     """Example usage of the viewport analyzer."""
-    from playwright.async_api import async_playwright
+    from browser_pool import get_browser_pool
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        page = await browser.new_page(viewport={"width": 1280, "height": 800})
+    browser_pool = get_browser_pool()
+    context = await browser_pool.get()
+    try:
+        page = await context.new_page()
         
         # Navigate to a test page
         await page.goto("https://aijobs.ai")
@@ -626,8 +950,9 @@ async def main():
                 verbose=True
             )
             print(json.dumps(scroll_result, indent=2))
-        
-        await browser.close()
+    finally:
+        await context.close()
+        await browser_pool.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+"""
+Shared vision-model request batching.
+
+Concurrent single-screenshot requests that use the same prompt are coalesced
+into one multi-image call, and the blocking OpenAI client runs off the event loop.
+"""
+
+import asyncio
+import json
+from typing import List, Dict, Optional
+
+from config import VISION_MODEL, VISION_SYSTEM_PROMPT
+
+# Concurrent screenshots with the same prompt are sent as one multi-image request
+BATCH_MAX_IMAGES = 4
+BATCH_WINDOW_SECONDS = 0.05
+
+
+def _image_data_uri(screenshot_base64: str) -> str:
+    """
+    Image URL for a screenshot given as base64 (JPEG recognised by its magic
+    bytes, anything else is PNG) or as an http(s) URL, which is passed through.
+    
+    Chat completions requests are JSON and image parts only take an image_url,
+    so there is no raw-bytes alternative; to skip base64 entirely, serve the
+    screenshots and set SCREENSHOT_BASE_URL (see viewport_analyzer).
+    """
+    if screenshot_base64.startswith(("http://", "https://")):
+        return screenshot_base64
+    mime = "image/jpeg" if screenshot_base64.startswith("/9j/") else "image/png"
+    return f"data:{mime};base64,{screenshot_base64}"
+
+
+class VisionBatcher:
+    """Coalesces concurrent single-screenshot vision requests into multi-image calls."""
+    
+    def __init__(self, client, max_images=BATCH_MAX_IMAGES, window=BATCH_WINDOW_SECONDS):
+        self.client = client
+        self.max_images = max_images
+        self.window = window
+        self._queue = None
+        self._worker = None
+        # The loop only keeps weak references to tasks; hold in-flight dispatches here
+        self._dispatches = set()
+    
+    async def submit(self, prompt: str, screenshot_base64: str, max_tokens: int, batch: bool = True) -> str:
+        """
+        Queue one screenshot + prompt and wait for the model's answer text.
+        
+        With batch=False the call goes out on its own (still off the event loop); use it
+        for answers that are acted on, such as bboxes, where a mix-up would click another page.
+        """
+        if not batch:
+            return await asyncio.to_thread(self._complete, prompt, [screenshot_base64], max_tokens)
+        
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, screenshot_base64, max_tokens, future))
+        return await future
+    
+    async def _run(self):
+        """Collect requests for up to `window` seconds, then dispatch them grouped by prompt."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_images:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[0], []).append(item)
+            for items in groups.values():
+                task = asyncio.create_task(self._dispatch(items))
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
+    
+    async def _dispatch(self, items):
+        """Run one vision call for a group of requests and resolve their futures."""
+        try:
+            if len(items) == 1:
+                prompt, screenshot_base64, max_tokens, _ = items[0]
+                answers = [await asyncio.to_thread(self._complete, prompt, [screenshot_base64], max_tokens)]
+            else:
+                answers = await asyncio.to_thread(self._complete_batch, items)
+        except Exception as e:
+            for *_, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (*_, future), answer in zip(items, answers):
+            if not future.done():
+                future.set_result(answer)
+    
+    def _complete(self, prompt: str, screenshots_base64: List[str], max_tokens: int) -> str:
+        """Blocking vision model call with one or more screenshots."""
+        response = self.client.chat.completions.create(
+            model=VISION_MODEL,
+            temperature=0.1,
+            max_tokens=max_tokens,
+            messages=[
+                {"role": "system", "content": VISION_SYSTEM_PROMPT},
+                {
+                    "role": "user",
+                    "content": [{"type": "text", "text": prompt}] + [
+                        {"type": "image_url", "image_url": {"url": _image_data_uri(b64)}}
+                        for b64 in screenshots_base64
+                    ]
+                }
+            ]
+        )
+        return response.choices[0].message.content.strip()
+    
+    def _complete_batch(self, items) -> List[str]:
+        """
+        Ask for one answer per screenshot in a single call, falling back to one call each.
+        
+        Every answer must name the screenshot it belongs to; answers are matched by that
+        number, never by their position in the reply.
+        """
+        prompt = items[0][0]
+        batch_prompt = (
+            f"You are given {len(items)} screenshots, numbered 1 to {len(items)}. "
+            f"Apply the task below to each screenshot independently and return a JSON array "
+            f"with exactly {len(items)} objects of the form "
+            f'{{"image": <screenshot number>, "answer": <answer for that screenshot>}}.\n\n{prompt}'
+        )
+        result = self._complete(batch_prompt, [item[1] for item in items], sum(item[2] for item in items))
+        
+        if result.startswith('```'):
+            result = result.split('\n', 1)[-1].rsplit('```', 1)[0].strip()
+        try:
+            answers = _answers_by_image(json.loads(result), len(items))
+        except json.JSONDecodeError:
+            answers = None
+        
+        if answers is None:
+            return [self._complete(p, [b64], max_tokens) for p, b64, max_tokens, _ in items]
+        return [json.dumps(answers[number]) for number in range(1, len(items) + 1)]
+
+
+def _answers_by_image(answers, count: int) -> Optional[Dict[int, object]]:
+    """Map screenshot number -> answer, or None unless each of 1..count is answered exactly once."""
+    if not isinstance(answers, list) or len(answers) != count:
+        return None
+    by_image = {}
+    for entry in answers:
+        if not isinstance(entry, dict) or "answer" not in entry:
+            return None
+        number = entry.get("image")
+        if type(number) is not int or not 1 <= number <= count or number in by_image:
+            return None
+        by_image[number] = entry["answer"]
+    return by_image
+
+
+_batchers: Dict[int, VisionBatcher] = {}
+
+
+def get_vision_batcher(client) -> VisionBatcher:
+    """Get the batcher shared by all discoveries using this client."""
+    if id(client) not in _batchers:
+        _batchers[id(client)] = VisionBatcher(client)
+    return _batchers[id(client)]
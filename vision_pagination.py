@@ -2,32 +2,586 @@
 Vision-based pagination detection using single element targeting.
 """
 
-import base64
+import asyncio
+import hashlib
+import json
 import os
+import re
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
+try:
+    # SIMD base64 (AVX2/AVX-512); same API as the stdlib module
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: cache writes are not locked
+
+try:
+    import numpy as np
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+from openai import BadRequestError
+
 from config import get_openai_client, LLM_API_AVAILABLE, VISION_MODEL
 from pagination import wait_for_page_settle
+from viewport_analyzer import _downscale_for_model, VLM_IMAGE_WIDTH
+
+DEBUG_SCREENSHOT_DIR = "scrapers/debug_screenshots"
+
+# Page sections are captured as JPEG: cheaper to encode than PNG and far smaller to upload
+SCREENSHOT_JPEG_QUALITY = 70
+
+# Page sections captured per round, and the answer budget for each
+PAGINATION_BATCH_MAX_IMAGES = 8
+PAGINATION_TOKENS_PER_IMAGE = 20
+# Sections per model request; longer pages are asked about in parallel requests
+PAGINATION_IMAGES_PER_REQUEST = 2
+PAGINATION_MAX_CONCURRENT_REQUESTS = 4
+# A slow node should fail fast rather than multiply a round's latency with SDK retries
+PAGINATION_MAX_RETRIES = 1
+
+# Longest side of a section as the model sees it; sections are cut to fit this once
+# downscaled to VLM_IMAGE_WIDTH, so text stays legible on tall pages
+FULL_PAGE_IMAGE_MAX_DIM = 1568
+
+# Instructions come first and stay fixed so the provider can reuse the cached prompt prefix
+PAGINATION_PROMPT = (
+    "Find pagination elements on this job listings page.\n\n"
+    "Look for:\n- \"Show More\" / \"Load More\" buttons\n- \"Next\" buttons (not \"Previous\")\n"
+    "- Higher page numbers (3, 4, 5, etc.)\n- Forward navigation arrows (→, >, »)\n"
+    " \"more jobs\" or \"more openings\"\n \"careers\"\n"
+    "Prioritize elements that load MORE content (avoid going backwards).\n\n"
+    "The page is shown as full-width images, numbered from the top down "
+    "(the middle of a very long page may be left out).\n"
+    "Coordinates are exact center coordinates in pixels within that image.\n\n"
+    "There are {count} images, sized {sizes}. "
+)
+# Answer format, appended last: JSON matching _pagination_response_format, or lines
+# for servers that reject response_format
+PAGINATION_JSON_FORMAT = (
+    "Return JSON {\"clicks\": [...]} with exactly one entry per image, in order: "
+    "[x, y] of the element to click, or null if no forward pagination is visible in that image."
+)
+PAGINATION_TEXT_FORMAT = (
+    "Return EXACTLY one line per image:\n"
+    "i: CLICK,x,y\n"
+    "or, if no forward pagination is visible in image i:\n"
+    "i: NONE"
+)
+# Answer for a section with nothing to click (None means the model gave no answer)
+NO_PAGINATION = ()
+# Base URLs of servers that rejected response_format; they get answer lines instead
+_no_structured_output: Set[str] = set()
+_ANSWER_LINE_RE = re.compile(r"^\s*(\d+)\s*[:.)]\s*(.+?)\s*$")
+_CLICK_ANSWER_RE = re.compile(r"^\s*CLICK\s*,\s*(\d+)\s*,\s*(\d+)\s*$", re.IGNORECASE)
+
+# High-confidence pagination controls, tried in order before any vision call.
+# "text:" rules are regexes on the trimmed label of links and buttons.
+DOM_PAGINATION_RULES = (
+    'a[rel="next"]',
+    '[aria-label*="next page" i]',
+    '[class*="paginat" i] [aria-label*="next" i]',
+    'text:^(load|show|view|see) more\\b',
+    'text:^more (jobs|openings|positions|roles|results)\\b',
+    'text:^next( page)?\\W*$',
+)
+
+_FIND_PAGINATION_JS = """(rules) => {
+    const clickable = 'a, button, [role="button"], input[type="button"], input[type="submit"]';
+    const usable = (el) => {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && !el.disabled &&
+            el.getAttribute('aria-disabled') !== 'true' && !/disabled/i.test(el.getAttribute('class') || '');
+    };
+    for (const rule of rules) {
+        let matches;
+        if (rule.startsWith('text:')) {
+            const pattern = new RegExp(rule.slice(5), 'i');
+            matches = [...document.querySelectorAll(clickable)].filter(
+                el => pattern.test((el.innerText || el.value || '').trim().replace(/\\s+/g, ' '))
+            );
+        } else {
+            matches = [...document.querySelectorAll(rule)];
+        }
+        for (const el of matches.filter(usable)) {
+            el.scrollIntoView({block: 'center', behavior: 'instant'});
+            const rect = el.getBoundingClientRect();
+            const x = Math.round(rect.left + rect.width / 2);
+            const y = Math.round(rect.top + rect.height / 2);
+            const hit = document.elementFromPoint(x, y);
+            if (hit && (hit === el || el.contains(hit) || hit.contains(el))) {
+                return {rule, x, y, scroll_y: window.pageYOffset};
+            }
+        }
+    }
+    return null;
+}"""
+
+_CLICK_AT_POINT_JS = """([x, y, expected]) => {
+    const element = document.elementFromPoint(x, y);
+    if (!element) {
+        return {success: false, error: 'No element found at coordinates'};
+    }
+    const result = {
+        tagName: element.tagName,
+        className: typeof element.className === 'string' ? element.className : (element.getAttribute('class') || ''),
+        text: (element.innerText || element.textContent || '').substring(0, 100),
+        id: element.id || '',
+        isClickable: element.tagName === 'BUTTON' || element.tagName === 'A' ||
+                     element.getAttribute('role') === 'button' ||
+                     window.getComputedStyle(element).cursor === 'pointer'
+    };
+    if (expected && ['tagName', 'className', 'id', 'text'].some(key => result[key] !== expected[key])) {
+        return {...result, success: false, error: 'Element at remembered coordinates has changed'};
+    }
+    element.click();
+    return {...result, success: true};
+}"""
+
+_PAGE_FINGERPRINT_JS = "() => location.href + '|' + document.body.scrollHeight + '|' + document.body.innerText.length"
+
+# Winning DOM rule per domain; None once no rule matched there, so vision is used directly
+_dom_pagination_rules: Dict[str, Optional[str]] = {}
+
+# Last successful pagination click per domain, replayed before anything else on later runs
+PAGINATION_CACHE_PATH = "scrapers/.vision_pagination_cache.json"
+PAGINATION_CACHE_SIZE = 100
+
+# Page sections already classified in this run, keyed by perceptual hash
+VISION_CACHE_SIZE = 64
+# Hashes differing in at most this many of their 64 bits count as the same section
+VISION_CACHE_MAX_DISTANCE = 4
+
+
+def _image_hash(screenshot_bytes: bytes) -> int:
+    """64-bit difference hash of a screenshot (a plain content hash without OpenCV)."""
+    if CV2_AVAILABLE:
+        gray = cv2.imdecode(np.frombuffer(screenshot_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is not None:
+            small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+            bits = np.packbits(small[:, 1:] > small[:, :-1])
+            return int.from_bytes(bits.tobytes(), "big")
+    return int.from_bytes(hashlib.blake2b(screenshot_bytes, digest_size=8).digest(), "big")
+
+
+def _cached_vision_result(cache: OrderedDict, screenshot_hash: int):
+    """Vision result for a screenshot close enough to one in the LRU cache, else None."""
+    max_distance = VISION_CACHE_MAX_DISTANCE if CV2_AVAILABLE else 0
+    for cached_hash in cache:
+        if (cached_hash ^ screenshot_hash).bit_count() <= max_distance:
+            cache.move_to_end(cached_hash)
+            return cache[cached_hash]
+    return None
+
+
+def _load_pagination_cache() -> OrderedDict:
+    """Load the winning clicks remembered from previous runs."""
+    try:
+        with open(PAGINATION_CACHE_PATH) as f:
+            return OrderedDict(json.load(f))
+    except (OSError, ValueError):
+        return OrderedDict()
+
+
+_pagination_cache = _load_pagination_cache()
+
+
+def _save_pagination_entry(domain: str, entry: Dict):
+    """
+    Record a domain's winning click, most recent last, keeping PAGINATION_CACHE_SIZE domains.
+    
+    The file is re-read under an exclusive lock so entries written by concurrent runs are kept.
+    """
+    try:
+        os.makedirs(os.path.dirname(PAGINATION_CACHE_PATH), exist_ok=True)
+        with open(PAGINATION_CACHE_PATH, "a+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                cache = OrderedDict(json.loads(f.read() or "{}"))
+            except ValueError:
+                cache = OrderedDict()
+            cache.pop(domain, None)
+            cache[domain] = entry
+            while len(cache) > PAGINATION_CACHE_SIZE:
+                cache.popitem(last=False)
+            f.seek(0)
+            f.truncate()
+            json.dump(cache, f)
+    except OSError:
+        cache = _pagination_cache.copy()
+        cache.pop(domain, None)
+        cache[domain] = entry
+    
+    _pagination_cache.clear()
+    _pagination_cache.update(cache)
+
+
+async def _remember_click(domain: str, scroll_y: int, click_x: int, click_y: int, click_result: Dict):
+    """Persist a successful click so the next run can replay it (written off the event loop)."""
+    entry = {
+        "scroll_y": scroll_y,
+        "click_x": click_x,
+        "click_y": click_y,
+        "tagName": click_result.get("tagName"),
+        "className": click_result.get("className"),
+        "id": click_result.get("id"),
+        # Identical markup with different text (e.g. a "Back" next to "Next") must not match
+        "text": click_result.get("text")
+    }
+    await asyncio.to_thread(_save_pagination_entry, domain, entry)
+
+
+def _save_debug_screenshot(path: str, screenshot_bytes: bytes):
+    """Write a page screenshot to disk for debugging (verbose runs only; runs in a worker thread)."""
+    try:
+        with open(path, "wb") as f:
+            f.write(screenshot_bytes)
+        print(f"[Vision] Saved: {path}")
+    except Exception as e:
+        print(f"[Vision] Could not save debug screenshot: {e}")
+
+
+async def _capture_sections(page, page_width: int, page_height: int, verbose: bool,
+                            debug_prefix: str = None) -> List[Tuple[int, int, bytes]]:
+    """
+    Screenshot the full page as full-width sections, top to bottom, without scrolling.
+    
+    Sections are as tall as still fits FULL_PAGE_IMAGE_MAX_DIM once downscaled for the
+    model. Pages taller than PAGINATION_BATCH_MAX_IMAGES sections keep their first section
+    and the bottom ones, where pagination controls usually are.
+    With debug_prefix, debug copies are written in worker threads.
+    
+    Returns:
+        (top offset, height, JPEG bytes) for each section
+    """
+    section_height = int(page_width * FULL_PAGE_IMAGE_MAX_DIM / VLM_IMAGE_WIDTH)
+    tops = list(range(0, page_height, section_height))
+    if len(tops) > PAGINATION_BATCH_MAX_IMAGES:
+        tops = tops[:1] + tops[1 - PAGINATION_BATCH_MAX_IMAGES:]
+    
+    sections = []
+    debug_writes = []
+    for top in tops:
+        height = min(section_height, page_height - top)
+        try:
+            screenshot_bytes = await page.screenshot(
+                full_page=True,
+                clip={"x": 0, "y": top, "width": page_width, "height": height},
+                type="jpeg",
+                quality=SCREENSHOT_JPEG_QUALITY,
+                scale="css"
+            )
+        except Exception as e:
+            if verbose:
+                print(f"[Vision] Error taking page screenshot: {e}")
+            break
+        
+        if verbose:
+            print(f"[Vision] Captured section {len(sections) + 1} ({top}-{top + height}px)")
+        sections.append((top, height, screenshot_bytes))
+        if debug_prefix:
+            debug_path = f"{debug_prefix}_section{len(sections)}.jpg"
+            debug_writes.append(asyncio.create_task(
+                asyncio.to_thread(_save_debug_screenshot, debug_path, screenshot_bytes)
+            ))
+    
+    await asyncio.gather(*debug_writes)
+    return sections
+
+
+@lru_cache(maxsize=PAGINATION_BATCH_MAX_IMAGES)
+def _pagination_response_format(count: int) -> Dict:
+    """JSON schema forcing one [x, y] or null per image, so answers are short and always parse."""
+    point = {"type": "array", "items": {"type": "integer"}, "minItems": 2, "maxItems": 2}
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "pagination_clicks",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "clicks": {
+                        "type": "array",
+                        "items": {"anyOf": [point, {"type": "null"}]},
+                        "minItems": count,
+                        "maxItems": count
+                    }
+                },
+                "required": ["clicks"],
+                "additionalProperties": False
+            }
+        }
+    }
+
+
+def _parse_answers(text: str, count: int) -> List[Optional[Tuple[int, ...]]]:
+    """Per-image (x, y) or NO_PAGINATION from a JSON answer, or from answer lines as a fallback."""
+    answers = [None] * count
+    try:
+        clicks = json.loads(text)["clicks"]
+    except (ValueError, TypeError, KeyError):
+        clicks = None
+    
+    if isinstance(clicks, list) and len(clicks) == count:
+        for index, click in enumerate(clicks):
+            if click is None:
+                answers[index] = NO_PAGINATION
+            elif isinstance(click, list) and len(click) == 2 and all(isinstance(v, int) for v in click):
+                answers[index] = tuple(click)
+        return answers
+    
+    for line in text.splitlines():
+        match = _ANSWER_LINE_RE.match(line)
+        if match and 1 <= int(match.group(1)) <= count:
+            answer = match.group(2)
+            click = _CLICK_ANSWER_RE.match(answer)
+            if click:
+                answers[int(match.group(1)) - 1] = (int(click.group(1)), int(click.group(2)))
+            elif "none" in answer.lower():
+                answers[int(match.group(1)) - 1] = NO_PAGINATION
+    return answers
+
+
+def _ask_pagination(client, screenshots: List[bytes], sizes: List[Tuple[int, int]]) -> List[Optional[Tuple[int, ...]]]:
+    """
+    Ask Qwen2.5-VL-72B for forward pagination in several page sections with one request.
+    
+    Screenshots are downscaled first (fewer vision tokens); answers are mapped back.
+    The answer is constrained to JSON where the server supports response_format.
+    
+    Args:
+        screenshots: Section JPEGs, top to bottom
+        sizes: (width, height) of each section in CSS pixels
+    
+    Returns:
+        (x, y) in section coordinates or NO_PAGINATION per section, in order
+        (None where the model gave no answer)
+    """
+    count = len(screenshots)
+    images = [_downscale_for_model(screenshot_bytes) for screenshot_bytes in screenshots]
+    image_sizes = ", ".join(
+        f"{i}: {round(width / factor)}x{round(height / factor)}"
+        for i, ((width, height), (_, factor)) in enumerate(zip(sizes, images), start=1)
+    )
+    prompt = PAGINATION_PROMPT.format(count=count, sizes=image_sizes)
+    image_parts = [
+        {
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:image/jpeg;base64,{base64.b64encode(image_bytes).decode('ascii')}"
+            }
+        }
+        for image_bytes, _ in images
+    ]
+    
+    def complete(structured: bool):
+        extra = {"response_format": _pagination_response_format(count)} if structured else {}
+        answer_format = PAGINATION_JSON_FORMAT if structured else PAGINATION_TEXT_FORMAT
+        return client.chat.completions.create(
+            model=VISION_MODEL,
+            temperature=0.1,
+            max_tokens=10 + PAGINATION_TOKENS_PER_IMAGE * count,
+            timeout=45.0,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [{"type": "text", "text": prompt + answer_format}] + image_parts
+                }
+            ],
+            **extra
+        )
+    
+    base_url = str(client.base_url)
+    if base_url not in _no_structured_output:
+        try:
+            response = complete(structured=True)
+        except BadRequestError as e:
+            message = str(e).lower()
+            if "response_format" not in message and "json_schema" not in message:
+                raise
+            # This server does not take a JSON schema; use answer lines for it from now on
+            _no_structured_output.add(base_url)
+            response = complete(structured=False)
+    else:
+        response = complete(structured=False)
+    
+    text = response.choices[0].message.content if response.choices else ""
+    answers = _parse_answers(text or "", count)
+    return [
+        (round(answer[0] * factor), round(answer[1] * factor)) if answer else answer
+        for answer, (_, factor) in zip(answers, images)
+    ]
+
+
+async def _ask_pagination_limited(semaphore: asyncio.Semaphore, client, screenshots: List[bytes],
+                                  sizes: List[Tuple[int, int]]) -> List[Optional[Tuple[int, ...]]]:
+    """_ask_pagination in a worker thread, with at most semaphore-many requests in flight."""
+    async with semaphore:
+        return await asyncio.to_thread(_ask_pagination, client, screenshots, sizes)
+
+
+def _parse_click(vision_result: Optional[Tuple[int, ...]], bounds: Dict, verbose: bool) -> Optional[Tuple[int, int]]:
+    """Coordinates from an answer if they are inside bounds (width/height), or None if there is nothing to click."""
+    if not vision_result:
+        return None
+    click_x, click_y = vision_result
+    
+    # Validate coordinates are within the screenshot
+    if not (0 <= click_x < bounds['width'] and 0 <= click_y < bounds['height']):
+        if verbose:
+            print(f"[Vision] Coordinates ({click_x}, {click_y}) outside screenshot bounds")
+        return None
+    
+    if verbose:
+        print(f"[Vision] Found pagination at coordinates: ({click_x}, {click_y})")
+    return click_x, click_y
+
+
+async def _click_at(page, click_x: int, click_y: int, click_number: int, verbose: bool,
+                    expected: Dict = None) -> Optional[Dict]:
+    """
+    Click the element at viewport coordinates and wait for the page to settle.
+    
+    Args:
+        expected: tagName/className/id/text the element must have (skips the click otherwise)
+    
+    Returns:
+        The clicked element's tagName, className, text and id, or None if nothing was clicked
+    """
+    # One round trip: identify the element at the point, check it, then click it
+    click_result = await page.evaluate(_CLICK_AT_POINT_JS, [click_x, click_y, expected])
+    
+    if verbose and 'tagName' in click_result:
+        print(f"[Vision] Element: <{click_result['tagName']}> clickable={click_result['isClickable']}")
+        print(f"[Vision] Text: '{click_result['text']}'")
+        print(f"[Vision] Class: '{click_result['className']}'")
+    
+    if not click_result['success']:
+        if verbose:
+            print(f"[Vision] Click failed: {click_result.get('error', 'Unknown error')}")
+        return None
+    
+    if verbose:
+        print(f"[Vision] ✅ CLICK #{click_number}: <{click_result['tagName']}> '{click_result['text']}'")
+    
+    # Wait for page to settle after click (handle navigation)
+    try:
+        await wait_for_page_settle(page, verbose=False, timeout=8000)
+        await page.wait_for_timeout(2000)  # Extra wait for dynamic content
+    except Exception as e:
+        if verbose:
+            print(f"[Vision] Page navigation detected: {e}")
+        # If navigation occurred, wait for new page to load
+        try:
+            await page.wait_for_load_state("domcontentloaded", timeout=10000)
+            await page.wait_for_timeout(3000)  # Extra wait for new page
+            if verbose:
+                print("[Vision] New page loaded after navigation")
+        except Exception as nav_error:
+            if verbose:
+                print(f"[Vision] Navigation wait failed: {nav_error}")
+    return click_result
+
+
+async def _click_dom_pagination(page, click_number: int, verbose: bool) -> bool:
+    """
+    Click a pagination control found by DOM_PAGINATION_RULES, without asking the model.
+    
+    Returns:
+        True if a control was clicked and the page changed, False to fall back to vision
+    """
+    domain = urlparse(page.url).netloc
+    rules = DOM_PAGINATION_RULES
+    if domain in _dom_pagination_rules:
+        if _dom_pagination_rules[domain] is None:
+            return False
+        rules = (_dom_pagination_rules[domain],)
+    
+    try:
+        before = await page.evaluate(_PAGE_FINGERPRINT_JS)
+        target = await page.evaluate(_FIND_PAGINATION_JS, list(rules))
+        if target is None:
+            if domain not in _dom_pagination_rules:
+                _dom_pagination_rules[domain] = None
+            return False
+        
+        if verbose:
+            print(f"[Vision] DOM match for {target['rule']} at ({target['x']}, {target['y']})")
+        click_result = await _click_at(page, target['x'], target['y'], click_number, verbose)
+        if not click_result:
+            return False
+        if await page.evaluate(_PAGE_FINGERPRINT_JS) == before:
+            if verbose:
+                print("[Vision] DOM click changed nothing, falling back to vision")
+            return False
+        
+        _dom_pagination_rules[domain] = target['rule']
+        await _remember_click(domain, target['scroll_y'], target['x'], target['y'], click_result)
+        return True
+    except Exception as e:
+        if verbose:
+            print(f"[Vision] DOM pagination check failed: {e}")
+        return False
+
+
+async def _replay_cached_click(page, entry: Dict, click_number: int, verbose: bool) -> bool:
+    """Click the remembered element again if it is still at the remembered spot."""
+    try:
+        await page.evaluate(f"window.scrollTo(0, {entry['scroll_y']})")
+        await page.wait_for_timeout(500)
+        if verbose:
+            print(f"[Vision] Replaying remembered click at ({entry['click_x']}, {entry['click_y']})")
+        before = await page.evaluate(_PAGE_FINGERPRINT_JS)
+        click_result = await _click_at(page, entry['click_x'], entry['click_y'], click_number, verbose, expected=entry)
+        # A control that no longer does anything (e.g. Next on the last page) is not a success
+        return click_result is not None and await page.evaluate(_PAGE_FINGERPRINT_JS) != before
+    except Exception as e:
+        if verbose:
+            print(f"[Vision] Replay failed: {e}")
+        return False
 
 
 async def vision_detect_pagination(page, verbose=False) -> dict:
     """Continuously find and click pagination elements until all are exhausted."""
     if not LLM_API_AVAILABLE:
         return {"mode": "none"}
-        
+    
+    total_clicks = 0
     try:
         client = get_openai_client()
         if not client:
             if verbose:
                 print("[Vision] No NEBIUS_API_KEY found")
             return {"mode": "none"}
+        client = client.with_options(max_retries=PAGINATION_MAX_RETRIES)
 
         viewport_size = page.viewport_size or {"width": 1280, "height": 800}
-        total_clicks = 0
         max_clicks = 20  # Safety limit to prevent infinite loops
+        vision_cache = OrderedDict()
+        cache_url = page.url
+        replay = True
         
+        # Debug screenshots are kept for verbose runs only, named by one timestamp per run
+        debug_prefix = None
         if verbose:
+            os.makedirs(DEBUG_SCREENSHOT_DIR, exist_ok=True)
+            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+            debug_prefix = f"{DEBUG_SCREENSHOT_DIR}/{urlparse(page.url).netloc}_{ts}"
             print("[Vision] Starting continuous pagination clicking until exhausted...")
         
         while total_clicks < max_clicks:
@@ -35,14 +589,17 @@ async def vision_detect_pagination(page, verbose=False) -> dict:
                 if verbose:
                     print(f"\n[Vision] === Pagination Round {total_clicks + 1} ===")
                 
+                # A navigation means a new page; earlier results no longer apply
+                if page.url != cache_url:
+                    vision_cache.clear()
+                    cache_url = page.url
+                
                 # Start from top of page for each search
                 await page.evaluate("window.scrollTo(0, 0)")
                 await page.wait_for_timeout(500)
                 
                 # Get current page dimensions
                 page_height = await page.evaluate("document.body.scrollHeight")
-                scroll_step = int(viewport_size['height'] * 0.75)  # 75% overlap
-                max_iterations = min(15, (page_height // scroll_step) + 2)
                 
                 found_pagination = False
             except Exception as e:
@@ -51,174 +608,88 @@ async def vision_detect_pagination(page, verbose=False) -> dict:
                 # If we can't even set up the round, we're likely done
                 break
             
-            # Scroll through page looking for pagination
-            for iteration in range(max_iterations):
-                try:
-                    current_scroll = await page.evaluate("window.pageYOffset")
-                    
-                    if verbose:
-                        print(f"[Vision] Scanning at scroll position {current_scroll}px")
-                    
-                    # Take viewport screenshot
-                    screenshot_bytes = await page.screenshot(full_page=False)
-                    screenshot_base64 = base64.b64encode(screenshot_bytes).decode('utf-8')
-                except Exception as e:
-                    if verbose:
-                        print(f"[Vision] Error during scroll/screenshot: {e}")
+            # Try the click that worked last time on this domain before any lookup
+            domain = urlparse(page.url).netloc
+            entry = _pagination_cache.get(domain)
+            if replay and entry:
+                if await _replay_cached_click(page, entry, total_clicks + 1, verbose):
+                    total_clicks += 1
+                    await _remember_click(domain, entry['scroll_y'], entry['click_x'], entry['click_y'], entry)
                     continue
-                
-                # Save debug screenshot
-                try:
-                    domain = urlparse(page.url).netloc
-                    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    os.makedirs("scrapers/debug_screenshots", exist_ok=True)
-                    debug_path = f"scrapers/debug_screenshots/{domain}_round{total_clicks+1}_scroll{current_scroll}_{ts}.png"
-                    with open(debug_path, "wb") as f:
-                        f.write(screenshot_bytes)
-                    if verbose:
-                        print(f"[Vision] Saved: {debug_path}")
-                except Exception as e:
-                    if verbose:
-                        print(f"[Vision] Could not save debug screenshot: {e}")
-                
-                # Ask Qwen2.5-VL-72B for pagination elements
-                response = client.chat.completions.create(
-                    model=VISION_MODEL,
-                    temperature=0.1,
-                    max_tokens=100,
-                    timeout=45.0,
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": f"Find pagination elements on this job listings page viewport.\n\nLook for:\n- \"Show More\" / \"Load More\" buttons\n- \"Next\" buttons (not \"Previous\")\n- Higher page numbers (3, 4, 5, etc.)\n- Forward navigation arrows (→, >, »)\n \"more jobs\" or \"more openings\"\n \"careers\"\nPrioritize elements that load MORE content (avoid going backwards).\n\nReturn EXACTLY:\nCLICK,x,y\n\nWhere x,y are exact center coordinates within viewport. \nViewport: {viewport_size['width']}x{viewport_size['height']}\n\nIf no forward pagination visible, return: NONE"
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/png;base64,{screenshot_base64}"
-                                    }
-                                }
-                            ]
-                        }
-                    ]
-                )
-                
-                vision_result = response.choices[0].message.content.strip() if response.choices else ""
-                
-                if verbose:
-                    print(f"[Vision] Vision result: {vision_result}")
-                
-                if "none" not in vision_result.lower():
-                    # Parse the response: CLICK,x,y
-                    try:
-                        parts = vision_result.strip().split(',')
-                        if len(parts) == 3 and parts[0].upper() == 'CLICK':
-                            click_x = int(parts[1])
-                            click_y = int(parts[2])
-                            
-                            # Validate coordinates are within viewport
-                            if 0 <= click_x < viewport_size['width'] and 0 <= click_y < viewport_size['height']:
-                                if verbose:
-                                    print(f"[Vision] Found pagination at viewport coordinates: ({click_x}, {click_y})")
-                                
-                                # Debug: Check what element is at those coordinates
-                                debug_result = await page.evaluate(f"""
-                                    () => {{
-                                        const element = document.elementFromPoint({click_x}, {click_y});
-                                        if (element) {{
-                                            return {{
-                                                tagName: element.tagName,
-                                                className: element.className || '',
-                                                text: (element.innerText || element.textContent || '').substring(0, 100),
-                                                id: element.id || '',
-                                                isClickable: element.tagName === 'BUTTON' || element.tagName === 'A' || 
-                                                            element.getAttribute('role') === 'button' ||
-                                                            window.getComputedStyle(element).cursor === 'pointer'
-                                            }};
-                                        }} else {{
-                                            return {{error: 'No element at coordinates'}};
-                                        }}
-                                    }}
-                                """)
-                                
-                                if verbose:
-                                    if 'error' not in debug_result:
-                                        print(f"[Vision] Element: <{debug_result['tagName']}> clickable={debug_result['isClickable']}")
-                                        print(f"[Vision] Text: '{debug_result['text']}'")
-                                        print(f"[Vision] Class: '{debug_result['className']}'")
-                                    else:
-                                        print(f"[Vision] Debug error: {debug_result['error']}")
-                                
-                                # Click the element
-                                click_result = await page.evaluate(f"""
-                                    () => {{
-                                        const element = document.elementFromPoint({click_x}, {click_y});
-                                        if (element) {{
-                                            element.click();
-                                            return {{
-                                                success: true,
-                                                tagName: element.tagName,
-                                                className: element.className || '',
-                                                text: (element.innerText || element.textContent || '').substring(0, 100),
-                                                id: element.id || ''
-                                            }};
-                                        }} else {{
-                                            return {{success: false, error: 'No element found at coordinates'}};
-                                        }}
-                                    }}
-                                """)
-                                
-                                if click_result['success']:
-                                    total_clicks += 1
-                                    if verbose:
-                                        print(f"[Vision] ✅ CLICK #{total_clicks}: <{click_result['tagName']}> '{click_result['text']}'")
-                                    
-                                    # Wait for page to settle after click (handle navigation)
-                                    try:
-                                        await wait_for_page_settle(page, verbose=False, timeout=8000)
-                                        await page.wait_for_timeout(2000)  # Extra wait for dynamic content
-                                    except Exception as e:
-                                        if verbose:
-                                            print(f"[Vision] Page navigation detected: {e}")
-                                        # If navigation occurred, wait for new page to load
-                                        try:
-                                            await page.wait_for_load_state("domcontentloaded", timeout=10000)
-                                            await page.wait_for_timeout(3000)  # Extra wait for new page
-                                            if verbose:
-                                                print("[Vision] New page loaded after navigation")
-                                        except Exception as nav_error:
-                                            if verbose:
-                                                print(f"[Vision] Navigation wait failed: {nav_error}")
-                                    
-                                    found_pagination = True
-                                    break  # Break inner loop to start new search from top
-                                else:
-                                    if verbose:
-                                        print(f"[Vision] Click failed: {click_result.get('error', 'Unknown error')}")
-                            else:
-                                if verbose:
-                                    print(f"[Vision] Coordinates ({click_x}, {click_y}) outside viewport bounds")
-                    
-                    except (ValueError, IndexError) as e:
-                        if verbose:
-                            print(f"[Vision] Error parsing coordinates: {e}")
-                
-                # Continue scrolling if no pagination found in current viewport
-                try:
-                    if current_scroll + scroll_step >= page_height:
-                        if verbose:
-                            print("[Vision] Reached end of page")
-                        break
+                # Gone or moved; later successful clicks overwrite the entry
+                replay = False
+                await page.evaluate("window.scrollTo(0, 0)")
+                await page.wait_for_timeout(500)
+            
+            # Standard pagination markup needs no model call
+            if await _click_dom_pagination(page, total_clicks + 1, verbose):
+                total_clicks += 1
+                continue
+            
+            # The whole page in a few full-width sections
+            sections = await _capture_sections(
+                page, viewport_size['width'], max(page_height, viewport_size['height']), verbose,
+                debug_prefix=f"{debug_prefix}_round{total_clicks + 1}" if debug_prefix else None
+            )
+            hashes = [_image_hash(screenshot_bytes) for _, _, screenshot_bytes in sections]
+            results = [_cached_vision_result(vision_cache, screenshot_hash) for screenshot_hash in hashes]
+            
+            # Uncached sections go out in small requests that all run at once
+            pending = [i for i, result in enumerate(results) if result is None]
+            semaphore = asyncio.Semaphore(PAGINATION_MAX_CONCURRENT_REQUESTS)
+            requests = {}
+            for start in range(0, len(pending), PAGINATION_IMAGES_PER_REQUEST):
+                chunk = pending[start:start + PAGINATION_IMAGES_PER_REQUEST]
+                request = asyncio.create_task(_ask_pagination_limited(
+                    semaphore, client,
+                    [sections[i][2] for i in chunk],
+                    [(viewport_size['width'], sections[i][1]) for i in chunk]
+                ))
+                for position, i in enumerate(chunk):
+                    requests[i] = (request, position)
+            if verbose and sections and not pending:
+                print("[Vision] Page looks unchanged since an earlier round, reusing its results")
+            
+            # The first section down the page with a clickable answer wins; answers are
+            # awaited in page order, so a click near the top does not wait for the rest
+            try:
+                for i, (top, height, _) in enumerate(sections):
+                    if i in requests:
+                        request, position = requests[i]
+                        try:
+                            results[i] = (await request)[position]
+                        except Exception as e:
+                            # A failed request is "no answer" for its sections; keep scanning
+                            if verbose:
+                                print(f"[Vision] Vision request for section {i + 1} failed: {e}")
+                        if results[i] is not None:
+                            vision_cache[hashes[i]] = results[i]
+                            if len(vision_cache) > VISION_CACHE_SIZE:
+                                vision_cache.popitem(last=False)
                     
-                    await page.evaluate(f"window.scrollTo(0, {current_scroll + scroll_step})")
-                    await page.wait_for_timeout(1000)
-                except Exception as e:
                     if verbose:
-                        print(f"[Vision] Error during scroll: {e}")
-                    break
+                        print(f"[Vision] Vision result for section {i + 1}: {results[i]}")
+                    target = _parse_click(results[i], {"width": viewport_size['width'], "height": height}, verbose)
+                    if target is None:
+                        continue
+                    
+                    # Center the target in the viewport (the browser clamps the scroll near the bottom)
+                    click_x, page_y = target[0], top + target[1]
+                    await page.evaluate(f"window.scrollTo(0, {max(0, page_y - viewport_size['height'] // 2)})")
+                    await page.wait_for_timeout(500)
+                    scroll_y = await page.evaluate("window.pageYOffset")
+                    click_result = await _click_at(page, click_x, page_y - scroll_y, total_clicks + 1, verbose)
+                    if click_result:
+                        total_clicks += 1
+                        await _remember_click(domain, scroll_y, click_x, page_y - scroll_y, click_result)
+                        found_pagination = True
+                        break  # Start new search from top
+            finally:
+                # Drop answers for sections below the click; calls already running in
+                # worker threads can't be interrupted and finish with their results discarded
+                for request, _ in requests.values():
+                    if not request.cancel() and not request.cancelled():
+                        request.exception()  # mark a failed, unneeded request as handled
             
             # If no pagination found in entire page, we're done
             if not found_pagination:
@@ -239,4 +710,7 @@ async def vision_detect_pagination(page, verbose=False) -> dict:
     except Exception as e:
         if verbose:
             print(f"[Vision] Error during pagination detection: {e}")
+        # Pages already loaded by earlier clicks still count
+        if total_clicks > 0:
+            return {"mode": "vision_click", "total_clicks": total_clicks}
         return {"mode": "none"}
\ No newline at end of file